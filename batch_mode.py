@@ -0,0 +1,202 @@
+from collections import Counter
+import contextlib
+import json
+import sys
+from catalog_queries import CatalogQueries
+from movie_app import API_KEY
+from storage.movie import Movie
+from storage.storage_event import StorageEvent
+
+
+class BatchRunner:
+
+    """
+    Non-interactive mode of the app. Reads commands as JSON lines, one object per line, like
+        {"command": "add", "title": "Alien"}
+        {"command": "filter", "minimum_rating": 8, "start_year": 1990}
+    and writes one JSON line with the result per command.
+
+    All reads of a batch see the catalog as it was when the batch started. Adds and deletes are
+    checked against that snapshot together with the earlier writes of the batch, and are saved
+    to the storage together after the last command. The results are written once they are saved:
+    the result of an add or a delete has "committed": true if the storage reported the change,
+    otherwise "ok" is false with the reason in "error".
+    """
+
+    COMMANDS = ('list', 'add', 'delete', 'stats', 'search', 'filter', 'sort', 'render')
+
+
+    def __init__(self, storage, omdb_client=None):
+        self._storage = storage
+        self._omdb_client = omdb_client
+        self._movies = None
+        self._queries = None
+        # case-folded title -> True if added or False if deleted by the commands of this batch
+        self._written_titles = {}
+        # (operation, argument, result) of the adds and deletes waiting for the end of the batch
+        self._pending_writes = []
+
+
+    def run(self, input_stream, output_stream):
+
+        """
+        Runs the commands from the input stream and writes the results to the output stream.
+        Messages printed by the storage and the renderer go to stderr to keep the output parseable.
+        """
+
+        results = []
+        try:
+            with contextlib.redirect_stdout(sys.stderr):
+                self._movies = list(self._storage.list_movies or [])
+                self._queries = CatalogQueries(self._movies)
+                self._written_titles = {}
+                for line_number, line in enumerate(input_stream, start=1):
+                    if not line.strip():
+                        continue
+                    results.append(self._run_command(line_number, line))
+                self._flush()
+        finally:
+            for result in results:
+                output_stream.write(json.dumps(result) + '\n')
+
+
+    def _run_command(self, line_number, line):
+
+        """Runs one command and returns its result, errors are returned instead of raised"""
+
+        command_id = line_number
+        try:
+            command = json.loads(line)
+            command_id = command.get('id', line_number)
+            name = command.get('command')
+            if name not in BatchRunner.COMMANDS:
+                raise ValueError(f'Unknown command {name!r}, the commands are: {", ".join(BatchRunner.COMMANDS)}')
+            pending_count = len(self._pending_writes)
+            result = {'id': command_id, 'command': name, 'ok': True,
+                      'result': getattr(self, f'_command_{name}')(command)}
+            if len(self._pending_writes) > pending_count:
+                operation, argument = self._pending_writes[-1]
+                self._pending_writes[-1] = (operation, argument, result)
+            return result
+        except Exception as e:
+            return {'id': command_id, 'ok': False, 'error': str(e)}
+
+
+    def _command_list(self, command):
+        return self._queries.list(command.get('offset', 0), command.get('limit'))
+
+
+    def _command_add(self, command):
+        title = command.get('title', '')
+        if len(title) == 0 or title.isspace():
+            raise ValueError('Movie title must not be blank')
+        if all(field in command for field in ('year', 'rating', 'poster')):
+            movie = Movie(title, command['rating'], command['year'], command['poster'])
+        else:
+            from omdb_client import movie_from_response
+            title, year, rating, poster = movie_from_response(self._get_omdb_client().get_movie(title))
+            movie = Movie(title, rating, year, poster)
+        if self._exists(movie.title):
+            raise ValueError('The movie is already in the database.')
+        self._written_titles[movie.title.casefold()] = True
+        self._pending_writes.append(('add', (movie.title, movie.year, movie.rating, movie.poster)))
+        return {'added': movie.to_dict()}
+
+
+    def _command_delete(self, command):
+        title = command.get('title', '')
+        if not self._exists(title):
+            raise ValueError('There is no such movie in the database :(')
+        self._written_titles[title.casefold()] = False
+        self._pending_writes.append(('delete', title))
+        return {'deleted': title}
+
+
+    def _command_stats(self, command):
+        return self._queries.stats()
+
+
+    def _command_search(self, command):
+        return self._queries.search(command.get('query', ''), command.get('limit', 10))
+
+
+    def _command_filter(self, command):
+        return self._queries.filter(command.get('minimum_rating', -1), command.get('start_year', -1),
+                                    command.get('end_year', 10000))
+
+
+    def _command_sort(self, command):
+        return self._queries.sort(command.get('by', 'rating'), command.get('latest_first', True),
+                                  command.get('limit'))
+
+
+    def _command_render(self, command):
+        from template_render import MoviesRender
+        MoviesRender(self._movies).render()
+        return {'movies': len(self._movies)}
+
+
+    def _exists(self, title):
+
+        """Checks if the movie is in the snapshot, taking the writes of this batch into account"""
+
+        written = self._written_titles.get(title.casefold())
+        if written is not None:
+            return written
+        return self._queries.find(title) is not None
+
+
+    def _flush(self):
+
+        """
+        Saves the writes of the batch in one transaction, the adds standing next to each other
+        go in one call for the storages that save every change right away. The storages print
+        their errors instead of raising them, so a write counts as committed only if the storage
+        reported the change with an event, and none does if the transaction fails.
+        """
+
+        reported = Counter()  # (operation, case-folded title) -> changes the storage reported
+
+        def storage_changed(event):
+            if event.kind == StorageEvent.ADDED:
+                reported[('add', event.movie.title.casefold())] += 1
+            elif event.kind == StorageEvent.DELETED:
+                reported[('delete', event.movie.title.casefold())] += 1
+
+        error = 'The storage did not save the change.'
+        movies_to_add = []
+        self._storage.subscribe(storage_changed)
+        try:
+            with self._storage.transaction():
+                for operation, argument, _ in self._pending_writes:
+                    if operation == 'add':
+                        movies_to_add.append(argument)
+                        continue
+                    if movies_to_add:
+                        self._storage.add_movies(movies_to_add)
+                        movies_to_add = []
+                    self._storage.delete_movie(argument)
+                if movies_to_add:
+                    self._storage.add_movies(movies_to_add)
+        except Exception as e:
+            print(f'The following error has occurred: {e}')
+            error = f'The changes of the batch were not saved: {e}'
+            reported.clear()
+        finally:
+            self._storage.unsubscribe(storage_changed)
+        for operation, argument, result in self._pending_writes:
+            title = argument[0] if operation == 'add' else argument
+            key = (operation, title.casefold())
+            if reported[key] > 0:
+                reported[key] -= 1
+                result['committed'] = True
+            else:
+                result.update(ok=False, committed=False, error=error)
+        self._pending_writes = []
+
+
+    def _get_omdb_client(self):
+        if self._omdb_client is None:
+            from omdb_client import OmdbClient
+            self._omdb_client = OmdbClient(API_KEY)
+        return self._omdb_client
@@ -0,0 +1,217 @@
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from benchmarks.catalog_generator import generate_movies, write_csv, write_json
+from duplicate_finder import DuplicateFinder
+from movie_search import MovieSearch
+from movie_stats import MovieStats
+from storage.storage_binary import StorageBinary
+from storage.storage_csv import StorageCsv
+from storage.storage_json import StorageJson
+from storage.storage_sqlite import StorageSqlite
+
+_BACKENDS = {
+    'json': lambda file_path: StorageJson(file_path),
+    'json-journaled': lambda file_path: StorageJson(file_path, journaled=True),
+    'csv': StorageCsv,
+    'sqlite': StorageSqlite,
+    'binary': StorageBinary,
+}
+_EXTENSIONS = {'json': '.json', 'json-journaled': '.json', 'csv': '.csv', 'sqlite': '.sqlite', 'binary': '.mvdb'}
+# the read-only operations go first, so they all see the generated catalog
+OPERATIONS = ('load', 'iterate', 'search_index', 'search', 'sort', 'filter', 'stats', 'render', 'duplicates',
+              'add', 'update', 'delete')
+_REPEATS = 5  # runs of the operations that are cheap enough, the result is the average
+_LARGE_CATALOG = 100000  # catalogs from this size on load and render only once
+_REGRESSION_THRESHOLD = 1.25  # slower than the baseline by this factor counts as a regression
+_NOISE_FLOOR_MS = 1.0  # faster operations vary too much between runs to call them regressions
+_RESULTS_DIRECTORY = os.path.join('benchmarks', 'results')
+
+
+def measure(operation, repeats):
+
+    """
+    Runs operation(run_number) repeats times and once more under tracemalloc,
+    returns the average time of a run in milliseconds and the peak memory allocated by the last run in KiB
+    """
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for run_number in range(repeats):
+            operation(run_number)
+        elapsed = (time.perf_counter() - start) / repeats * 1000
+        tracemalloc.start()
+        try:
+            operation(repeats)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return elapsed, peak / 1024
+
+
+def write_catalog(backend, file_path, movies):
+
+    """Writes the movies to a new catalog file of the backend"""
+
+    if backend == 'csv':
+        write_csv(file_path, movies)
+    elif backend == 'sqlite':
+        StorageSqlite(file_path).add_movies([(movie.title, movie.year, movie.rating, movie.poster)
+                                             for movie in movies])
+    elif backend == 'binary':
+        StorageBinary._write_movies(file_path, movies)
+    else:
+        write_json(file_path, movies)
+
+
+def benchmark_backend(backend, movies, directory, operations):
+
+    """Times the operations on a fresh catalog of the backend, returns {operation: (ms, peak KiB)}"""
+
+    file_path = os.path.join(directory, f'{backend}{_EXTENSIONS[backend]}')
+    write_catalog(backend, file_path, movies)
+    size = len(movies)
+    repeats = 1 if size >= _LARGE_CATALOG else _REPEATS
+    storage = _BACKENDS[backend](file_path)
+    titles = [movie.title for movie in storage.list_movies]
+    generator = random.Random(size)
+    changed_titles = generator.sample(titles, 2 * (_REPEATS + 1))
+    updated_titles, deleted_titles = changed_titles[:_REPEATS + 1], changed_titles[_REPEATS + 1:]
+    # a misspelled part of an existing title, like a user would type it
+    queries = [' '.join(title.split()[:2])[:-1] for title in generator.sample(titles, _REPEATS + 1)]
+    search = MovieSearch(titles)
+    site_directory = os.path.join(directory, 'site')
+    if not os.path.exists(site_directory):
+        shutil.copytree('templates', os.path.join(site_directory, 'templates'))
+
+    def render(run_number):
+        from template_render import MoviesRender
+        working_directory = os.getcwd()
+        os.chdir(site_directory)
+        try:
+            # a full build every time, not the one skipping the pages that didn't change
+            if os.path.exists(MoviesRender._MANIFEST_FILENAME):
+                os.remove(MoviesRender._MANIFEST_FILENAME)
+            MoviesRender(storage.list_movies).render()
+        finally:
+            os.chdir(working_directory)
+
+    def stats(run_number):
+        movie_stats = MovieStats(storage.list_movies)
+        movie_stats.average(), movie_stats.median(), movie_stats.best(), movie_stats.worst()
+
+    benchmarks = {
+        'load': (lambda run_number: _BACKENDS[backend](file_path).list_movies, repeats),
+        # a fresh storage, so the backends that can stream the movies don't load them all
+        'iterate': (lambda run_number: sum(1 for _ in _BACKENDS[backend](file_path).iter_movies()), repeats),
+        'search_index': (lambda run_number: MovieSearch(movie.title for movie in storage.list_movies), repeats),
+        'search': (lambda run_number: storage.find_movie(queries[run_number]) or search.search(queries[run_number]),
+                   _REPEATS),
+        'sort': (lambda run_number: (storage.movies_sorted_by_rating(), storage.movies_sorted_by_year(True)),
+                 _REPEATS),
+        'filter': (lambda run_number: storage.filter_movies(7, 1990, 2010), _REPEATS),
+        'stats': (stats, repeats),
+        'render': (render, 1),
+        'duplicates': (lambda run_number: DuplicateFinder(storage.iter_movies()).find(), 1),
+        'add': (lambda run_number: storage.add_movie(f'Benchmark Movie {run_number}', 2000, 7.5,
+                                                     'https://example.com/posters/new.jpg'), _REPEATS),
+        'update': (lambda run_number: storage.update_movie(updated_titles[run_number], 9.9), _REPEATS),
+        'delete': (lambda run_number: storage.delete_movie(deleted_titles[run_number]), _REPEATS),
+    }
+    return {operation: measure(*benchmarks[operation]) for operation in OPERATIONS if operation in operations}
+
+
+def run(sizes, backends, operations):
+
+    """Benchmarks every backend on catalogs of every size, prints and returns the results"""
+
+    results = []
+    print(f'{"backend":>15} {"movies":>9} {"operation":>13} {"ms":>12} {"peak KiB":>12}')
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            movies = generate_movies(size)
+            for backend in backends:
+                for operation, (elapsed, peak) in benchmark_backend(backend, movies, directory, operations).items():
+                    print(f'{backend:>15} {size:>9} {operation:>13} {elapsed:>12.3f} {peak:>12.1f}')
+                    results.append({'backend': backend, 'size': size, 'operation': operation,
+                                    'ms': round(elapsed, 4), 'peak_kib': round(peak, 1)})
+    return results
+
+
+def compare(baseline, results, threshold=_REGRESSION_THRESHOLD):
+
+    """Prints the time of every result against the same measurement of the baseline, returns the regressions"""
+
+    baseline_results = {(result['backend'], result['size'], result['operation']): result
+                        for result in baseline['results']}
+    regressions = []
+    print(f'\nAgainst {baseline["label"]}:')
+    print(f'{"backend":>15} {"movies":>9} {"operation":>13} {"baseline ms":>12} {"ms":>12} {"ratio":>8}')
+    for result in results:
+        old_result = baseline_results.get((result['backend'], result['size'], result['operation']))
+        if old_result is None:
+            continue
+        ratio = result['ms'] / old_result['ms'] if old_result['ms'] else float('inf')
+        regressed = ratio > threshold and result['ms'] > _NOISE_FLOOR_MS
+        if regressed:
+            regressions.append(result)
+        print(f'{result["backend"]:>15} {result["size"]:>9} {result["operation"]:>13} '
+              f'{old_result["ms"]:>12.3f} {result["ms"]:>12.3f} {ratio:>7.2f}x{"  slower" if regressed else ""}')
+    return regressions
+
+
+def _current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the storage backends and the app operations '
+                                                 'on synthetic catalogs')
+    parser.add_argument('sizes', nargs='*', type=int, default=[1000, 10000, 100000],
+                        help='catalog sizes, up to 1000000')
+    parser.add_argument('--backends', nargs='+', choices=list(_BACKENDS), default=list(_BACKENDS))
+    parser.add_argument('--operations', nargs='+', choices=OPERATIONS, default=list(OPERATIONS))
+    parser.add_argument('--label', help='name of the results, the current commit by default')
+    parser.add_argument('--output', help=f'results file, {_RESULTS_DIRECTORY}/LABEL.json by default')
+    parser.add_argument('--compare', metavar='BASELINE', help='results file to compare the times with')
+    args = parser.parse_args()
+
+    label = args.label or _current_commit() or datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+    report = {
+        'label': label,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': _current_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': run(args.sizes, args.backends, args.operations),
+    }
+    output = args.output or os.path.join(_RESULTS_DIRECTORY, f'{label}.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=1)
+    print(f'Results saved to {output}')
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(json.load(file), report['results'])
+        if regressions:
+            sys.exit(f'{len(regressions)} measurements are more than {_REGRESSION_THRESHOLD}x slower')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+import csv
+import json
+import os
+import random
+import sys
+from storage.movie import Movie
+from storage.storage_csv import StorageCsv
+
+_WORDS = ['the', 'dark', 'knight', 'lord', 'rings', 'star', 'wars', 'return', 'king', 'matrix', 'spider', 'man',
+          'lost', 'cause', 'batman', 'avengers', 'gladiator', 'troy', 'thor', 'men', 'gorge', 'night', 'day',
+          'city', 'river', 'storm', 'empire', 'ghost', 'shadow', 'dream', 'fire', 'ice', 'blood', 'moon', 'sun',
+          'war', 'love', 'last', 'first', 'final', 'secret', 'silent', 'wild', 'iron', 'golden', 'broken']
+FIRST_YEAR = 1920
+LAST_YEAR = 2025
+
+
+def generate_titles(count, seed=0):
+
+    """Generates unique synthetic movie titles"""
+
+    generator = random.Random(seed)
+    titles = set()
+    while len(titles) < count:
+        words = generator.sample(_WORDS, generator.randint(1, 4))
+        titles.add(' '.join(words).title() + f' {generator.randint(1, count)}')
+    return list(titles)
+
+
+def generate_movies(count, seed=0):
+
+    """Generates a synthetic catalog of count movies, the same one for the same seed"""
+
+    generator = random.Random(seed)
+    return [Movie(title, round(generator.uniform(1, 10), 1), generator.randint(FIRST_YEAR, LAST_YEAR),
+                  f'https://example.com/posters/{number}.jpg')
+            for number, title in enumerate(generate_titles(count, seed))]
+
+
+def generate_variants(movies, count, seed=0):
+
+    """
+    Generates count movies that are variants of the given ones, the way the same movie is added twice:
+    with other punctuation and case, words written together, a typo or the year off by one
+    """
+
+    generator = random.Random(seed)
+    variants = []
+    for movie in generator.sample(movies, count):
+        words = movie.title.split()
+        change = generator.randrange(4)
+        if change == 0 and len(words) > 1:
+            position = generator.randrange(1, len(words))
+            joined = words[position - 1] + '-' + words[position]
+            title = ' '.join(words[:position - 1] + [joined] + words[position + 1:])
+        elif change == 1 and len(words) > 1:
+            title = ': '.join([' '.join(words[:-1]).upper(), words[-1]])
+        elif change == 2 and len(words[0]) > 3:
+            typo = generator.randrange(1, len(words[0]) - 1)
+            title = ' '.join([words[0][:typo] + words[0][typo + 1] + words[0][typo] + words[0][typo + 2:]] + words[1:])
+        else:
+            title = movie.title.lower()
+        year = movie.year + generator.choice([-1, 0, 0, 1])
+        variants.append(Movie(title, movie.rating, year, movie.poster))
+    return variants
+
+
+def write_json(file_path, movies):
+    with open(file_path, 'w') as file:
+        json.dump([movie.to_dict() for movie in movies], file)
+
+
+def write_csv(file_path, movies):
+    with open(file_path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=StorageCsv._FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(movie.to_dict() for movie in movies)
+
+
+def write_catalog(file_path, movies):
+
+    """Writes the movies in the format of the file extension, .json or .csv"""
+
+    extension = os.path.splitext(file_path)[1]
+    if extension == '.json':
+        write_json(file_path, movies)
+    elif extension == '.csv':
+        write_csv(file_path, movies)
+    else:
+        raise ValueError(f'Catalogs can be written only to .json or .csv files, not {file_path}')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        sys.exit('Usage: python -m benchmarks.catalog_generator COUNT FILE [SEED]')
+    write_catalog(sys.argv[2], generate_movies(int(sys.argv[1]), int(sys.argv[3]) if len(sys.argv) > 3 else 0))
@@ -0,0 +1,86 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from storage.storage_json import StorageJson
+from storage.storage_csv import StorageCsv
+
+
+class OmdbStub:
+
+    """
+    Local stand-in for the OMDb API answering ?t=title requests from a catalog file,
+    so the refresh and the import can be run and timed without the network or an API key.
+    A share of the movies gets a different rating than the catalog has, every request waits for the latency.
+    """
+
+    def __init__(self, movies, change_rate=0.1, latency=0.05, seed=0):
+        generator = random.Random(seed)
+        self._latency = latency
+        self._movies = {}  # case-folded title -> OMDb response
+        for movie in movies:
+            rating = movie.rating
+            if generator.random() < change_rate:
+                rating = round(min(10.0, max(1.0, rating + generator.choice([-0.2, -0.1, 0.1, 0.2]))), 1)
+            self._movies[movie.title.casefold()] = {
+                'Response': 'True', 'Title': movie.title, 'Year': str(movie.year),
+                'imdbRating': str(rating), 'Poster': movie.poster,
+            }
+        self.requests = 0
+        self._lock = threading.Lock()
+
+
+    def respond(self, title):
+        with self._lock:
+            self.requests += 1
+        time.sleep(self._latency)
+        return self._movies.get(title.casefold(), {'Response': 'False', 'Error': 'Movie not found!'})
+
+
+    def serve(self, host='127.0.0.1', port=8001):
+
+        """Returns the started HTTP server answering in its own thread, shutdown() stops it"""
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parameters = parse_qs(urlsplit(self.path).query)
+                body = json.dumps(stub.respond(parameters.get('t', [''])[0])).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serves the movies of a catalog file like the OMDb API')
+    parser.add_argument('catalog', help='.json or .csv catalog the answers come from')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--change-rate', type=float, default=0.1, help='share of the movies with a new rating')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds every request takes')
+    args = parser.parse_args()
+
+    storage = StorageCsv(args.catalog) if args.catalog.endswith('.csv') else StorageJson(args.catalog)
+    stub = OmdbStub(storage.iter_movies(), args.change_rate, args.latency)
+    server = stub.serve(port=args.port)
+    print(f'OMDb stub on http://127.0.0.1:{args.port}/, Ctrl+C to stop')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+import random
+import sys
+import time
+from thefuzz import fuzz
+from benchmarks.catalog_generator import generate_titles
+from movie_search import MovieSearch
+
+_QUERIES = 20
+
+
+def brute_force_search(titles, query):
+
+    """The search the app did before the index: scores every title in the catalog"""
+
+    suggestions = []
+    for title in titles:
+        if query.lower() == title.lower():
+            return [title]
+        elif fuzz.token_set_ratio(title, query) > 50:
+            suggestions.append(title)
+    return suggestions
+
+
+def time_queries(search, queries):
+
+    """Returns the average time of one query in milliseconds"""
+
+    start = time.perf_counter()
+    for query in queries:
+        search(query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main(sizes):
+    print(f'{"titles":>10} {"build, ms":>12} {"brute force, ms":>16} {"index, ms":>12} {"speedup":>9}')
+    for size in sizes:
+        titles = generate_titles(size)
+        # a misspelled part of an existing title, like a user would type it
+        queries = [' '.join(title.split()[:2])[:-1] for title in random.Random(1).sample(titles, _QUERIES)]
+        start = time.perf_counter()
+        index = MovieSearch(titles)
+        build_time = (time.perf_counter() - start) * 1000
+        brute_force_time = time_queries(lambda query: brute_force_search(titles, query), queries)
+        index_time = time_queries(index.search, queries)
+        print(f'{size:>10} {build_time:>12.1f} {brute_force_time:>16.2f} {index_time:>12.2f} '
+              f'{brute_force_time / index_time:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or [1000, 10000, 50000])
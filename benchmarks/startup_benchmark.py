@@ -0,0 +1,52 @@
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+_RUNS = 10
+_HEAVY_MODULES = ['matplotlib', 'thefuzz', 'requests', 'jinja2']
+
+# runs in a fresh interpreter: imports the app, creates it and prints the menu like main.py does
+_STARTUP_SCRIPT = '''
+import contextlib, io, json, sys, time
+start = time.perf_counter()
+from movie_app import MovieApp
+from storage.storage_json import StorageJson
+imported = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    app = MovieApp(StorageJson(sys.argv[1]))
+    app.title()
+    app.menu()
+menu_shown = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "first_menu_ms": (menu_shown - start) * 1000,
+    "loaded_heavy_modules": [name for name in sys.argv[2:] if name in sys.modules],
+}))
+'''
+
+
+def measure_startup(file_path):
+
+    """Starts the app in a fresh interpreter and returns its timings along with the whole process time"""
+
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', _STARTUP_SCRIPT, file_path, *_HEAVY_MODULES],
+                            capture_output=True, text=True, check=True).stdout
+    process_time = (time.perf_counter() - start) * 1000
+    timings = json.loads(output.splitlines()[-1])
+    timings['process_ms'] = process_time
+    return timings
+
+
+def main(file_path, runs):
+    results = [measure_startup(file_path) for _ in range(runs)]
+    for metric in ('import_ms', 'first_menu_ms', 'process_ms'):
+        values = [result[metric] for result in results]
+        print(f'{metric:>14}: median {statistics.median(values):8.1f}, min {min(values):8.1f}, max {max(values):8.1f}')
+    print(f'heavy modules loaded at startup: {", ".join(results[-1]["loaded_heavy_modules"]) or "none"}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else 'data/data.json', int(sys.argv[2]) if len(sys.argv) > 2 else _RUNS)
@@ -0,0 +1,98 @@
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import requests
+from omdb_client import movie_from_response
+
+
+class BulkImporter:
+
+    """
+    Imports many movies at once: resolves the titles against OMDb in a bounded pool of threads
+    and adds all valid movies to the storage in one batched write.
+    The rate of the requests is limited by the OMDb client.
+    """
+
+    MAX_WORKERS = 8
+
+
+    def __init__(self, storage, omdb_client, max_workers=MAX_WORKERS):
+        self._storage = storage
+        self._omdb_client = omdb_client
+        self._max_workers = max_workers
+
+
+    @staticmethod
+    def read_titles(file_path):
+
+        """
+        Reads the titles from a text file with one title per line, or from a CSV file
+        with the Title column (the first column is used if there is no such column).
+        Blank lines and repeated titles are skipped.
+        """
+
+        with open(file_path, 'r', encoding='utf-8', newline='') as file:
+            if file_path.lower().endswith('.csv'):
+                rows = list(csv.reader(file))
+                if rows and 'Title' in rows[0]:
+                    title_column = rows[0].index('Title')
+                    rows = rows[1:]
+                else:
+                    title_column = 0
+                raw_titles = [row[title_column] for row in rows if len(row) > title_column]
+            else:
+                raw_titles = file.read().splitlines()
+        titles = {}
+        for title in raw_titles:
+            title = title.strip()
+            if title:
+                titles.setdefault(title.casefold(), title)
+        return list(titles.values())
+
+
+    def import_titles(self, titles):
+
+        """
+        Resolves the titles and adds the valid ones to the storage.
+        Returns the list of added (title, year, rating, poster) movies
+        and the list of (title, reason) for the skipped ones.
+        """
+
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            results = list(executor.map(self._resolve, titles))
+        movies_to_add = []
+        added_titles = set()
+        skipped = []
+        for title, movie, error in results:
+            if error is not None:
+                skipped.append((title, error))
+                continue
+            movie_title = movie[0]
+            if movie_title.casefold() in added_titles or self._storage.find_movie(movie_title) is not None:
+                skipped.append((title, 'The movie is already in the database.'))
+                continue
+            added_titles.add(movie_title.casefold())
+            movies_to_add.append(movie)
+        if movies_to_add:
+            self._storage.add_movies(movies_to_add)
+        return movies_to_add, skipped
+
+
+    def import_file(self, file_path):
+
+        """Reads the titles from the file and imports them"""
+
+        return self.import_titles(BulkImporter.read_titles(file_path))
+
+
+    def _resolve(self, title):
+
+        """Returns (title, movie, None) for a valid movie or (title, None, reason) otherwise"""
+
+        try:
+            return title, movie_from_response(self._omdb_client.get_movie(title)), None
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            return title, None, 'Impossible to connect to the API!'
+        except requests.exceptions.JSONDecodeError:
+            return title, None, 'No data from the API'
+        except Exception as e:
+            return title, None, str(e)
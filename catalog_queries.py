@@ -0,0 +1,82 @@
+import random
+from movie_search import MovieSearch
+from movie_stats import MovieStats
+from storage.movie_indexes import MovieIndexes
+
+
+class CatalogQueries:
+
+    """
+    Read-only queries over a snapshot of the catalog with the results shaped as JSON-ready dicts.
+    The indexes are built once for the snapshot, the search index and the statistics
+    on the first query that needs them.
+    """
+
+    def __init__(self, movies):
+        self._movies = movies
+        self._indexes = MovieIndexes(movies)
+        self._search = None
+        self._stats = None
+
+
+    def __len__(self):
+        return len(self._movies)
+
+
+    def find(self, title):
+
+        """Returns the movie with the given title ignoring the case or None"""
+
+        return self._indexes.find(title)
+
+
+    def list(self, offset=0, limit=None):
+        movies = self._movies[offset:] if limit is None else self._movies[offset:offset + limit]
+        return {'total': len(self._movies), 'movies': [movie.to_dict() for movie in movies]}
+
+
+    def stats(self):
+        if self._stats is None:
+            self._stats = MovieStats(self._movies)
+        best_rating, best_titles = self._stats.best()
+        worst_rating, worst_titles = self._stats.worst()
+        return {
+            'count': len(self._stats),
+            'average_rating': self._stats.average(),
+            'median_rating': self._stats.median(),
+            'best': {'rating': best_rating, 'titles': best_titles},
+            'worst': {'rating': worst_rating, 'titles': worst_titles},
+        }
+
+
+    def search(self, query, limit=10):
+        if len(query) == 0 or query.isspace():
+            raise ValueError('Movie title must not be blank')
+        movie = self.find(query)
+        if movie is not None:
+            return {'found': movie.to_dict(), 'suggestions': []}
+        if self._search is None:
+            self._search = MovieSearch(movie.title for movie in self._movies)
+        suggestions = self._search.search(query, limit)
+        return {'found': None, 'suggestions': [{'title': title, 'score': score} for title, score in suggestions]}
+
+
+    def filter(self, minimum_rating=-1, start_year=-1, end_year=10000):
+        movies = self._indexes.filter(minimum_rating, start_year, end_year)
+        return {'movies': [movie.to_dict() for movie in movies]}
+
+
+    def sort(self, by='rating', latest_first=True, limit=None):
+        if by == 'rating':
+            movies = self._indexes.sorted_by_rating(limit)
+        elif by == 'year':
+            movies = self._indexes.sorted_by_year(latest_first)[:limit]
+        else:
+            raise ValueError('Movies can be sorted only by "rating" or "year".')
+        return {'movies': [movie.to_dict() for movie in movies]}
+
+
+    def random(self):
+        if not self._movies:
+            raise ValueError('There are no movies in the database.')
+        return {'movie': random.choice(self._movies).to_dict()}
@@ -0,0 +1,164 @@
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import os
+import re
+import unicodedata
+from metrics import metrics
+
+# (normalized title, title without spaces, series numbers) of the movies and the threshold,
+# set in every process of the pool once instead of being sent with every chunk
+_worker_titles = None
+_worker_threshold = None
+
+
+class DuplicateFinder:
+
+    """
+    Finds the movies that were likely added twice under a slightly different title, like
+    "Spider Man: Lost Cause" and "Spider-Man Lost Cause", without comparing every pair of movies.
+    The titles are normalized to lower case words without accents and punctuation, and the candidate pairs come
+    from cheap passes over them: blocking puts the movies with the same rarest word and close years together,
+    and the sorted neighborhood compares every title with the next ones in the order of the titles written
+    without spaces, and written backwards, which catches the words written together or apart and a typo
+    in the rarest word. Only the candidate pairs are scored with the fuzzy matcher, in a pool of processes
+    when there are many of them.
+    """
+
+    SIMILARITY_THRESHOLD = 90  # the score from which two titles count as the same one
+    MAX_YEAR_DIFFERENCE = 1  # the sources often disagree about the year by one
+    _MAX_BLOCK_SIZE = 100  # bigger blocks are made of words too common to say anything, they are left out
+    _WINDOW = 5  # titles the sorted neighborhood compares every title with
+    _CHUNK_SIZE = 20000  # candidate pairs a process of the pool scores at a time
+    _MIN_PARALLEL_PAIRS = 200000  # fewer candidate pairs are scored in this process, starting the pool costs more
+    _WORD_PATTERN = re.compile(r'\w+')
+    # numbers that tell the parts of a series apart, titles that differ in them are never duplicates
+    _ROMAN_NUMERALS = frozenset(['ii', 'iii', 'iv', 'v', 'vi', 'vii', 'viii', 'ix', 'x'])
+
+
+    def __init__(self, movies, similarity_threshold=SIMILARITY_THRESHOLD, max_workers=None):
+        self._movies = list(movies)
+        self._similarity_threshold = similarity_threshold
+        self._max_workers = max_workers or os.cpu_count() or 1
+        self._words = [DuplicateFinder.normalize(movie.title) for movie in self._movies]
+
+
+    def find(self):
+
+        """Returns the list of (score, movie, other movie) likely duplicates, the most similar first"""
+
+        with metrics.timer('duplicates.candidates'):
+            pairs = sorted(self.candidate_pairs())
+        metrics.count('duplicates.candidate_pairs', len(pairs))
+        titles = [' '.join(words) for words in self._words]
+        with metrics.timer('duplicates.fuzzy_matching'):
+            if len(pairs) < DuplicateFinder._MIN_PARALLEL_PAIRS or self._max_workers == 1:
+                _init_worker(titles, self._similarity_threshold)
+                scored = _score_pairs(pairs)
+            else:
+                chunks = [pairs[start:start + DuplicateFinder._CHUNK_SIZE]
+                          for start in range(0, len(pairs), DuplicateFinder._CHUNK_SIZE)]
+                with ProcessPoolExecutor(max_workers=self._max_workers, initializer=_init_worker,
+                                         initargs=(titles, self._similarity_threshold)) as executor:
+                    scored = [result for results in executor.map(_score_pairs, chunks) for result in results]
+        duplicates = [(score, self._movies[number], self._movies[other_number])
+                      for number, other_number, score in scored]
+        duplicates.sort(key=lambda duplicate: duplicate[0], reverse=True)
+        return duplicates
+
+
+    def candidate_pairs(self):
+
+        """Returns the set of (number, other number) pairs of the movies worth scoring, the smaller number first"""
+
+        pairs = set()
+        self._add_block_pairs(pairs)
+        self._add_neighborhood_pairs(pairs)
+        return pairs
+
+
+    def _add_block_pairs(self, pairs):
+
+        """Pairs the movies with the same rarest word released at most a year apart"""
+
+        frequencies = Counter(word for words in self._words for word in set(words))
+        blocks = defaultdict(list)  # (word, year) -> numbers of the movies
+        for number, words in enumerate(self._words):
+            if words:
+                rarest_word = min(words, key=lambda word: (frequencies[word], word))
+                blocks[(rarest_word, self._movies[number].year)].append(number)
+        for (word, year), numbers in blocks.items():
+            if len(numbers) > DuplicateFinder._MAX_BLOCK_SIZE:
+                continue
+            for position, number in enumerate(numbers):
+                for other_number in numbers[position + 1:]:
+                    self._add_pair(pairs, number, other_number)
+            for year_difference in range(1, DuplicateFinder.MAX_YEAR_DIFFERENCE + 1):
+                other_numbers = blocks.get((word, year + year_difference), ())
+                if len(other_numbers) > DuplicateFinder._MAX_BLOCK_SIZE:
+                    continue
+                for number in numbers:
+                    for other_number in other_numbers:
+                        self._add_pair(pairs, number, other_number)
+
+
+    def _add_neighborhood_pairs(self, pairs):
+
+        """Pairs every movie with the next ones in the order of the titles without spaces, then written backwards"""
+
+        keys = [''.join(words) for words in self._words]
+        for key in (keys.__getitem__, lambda number: keys[number][::-1]):
+            order = sorted(range(len(self._movies)), key=key)
+            for position, number in enumerate(order):
+                for other_number in order[position + 1:position + DuplicateFinder._WINDOW]:
+                    self._add_pair(pairs, number, other_number)
+
+
+    def _add_pair(self, pairs, number, other_number):
+        if abs(self._movies[number].year - self._movies[other_number].year) > DuplicateFinder.MAX_YEAR_DIFFERENCE:
+            return
+        if number > other_number:
+            number, other_number = other_number, number
+        pairs.add((number, other_number))
+
+
+    @staticmethod
+    def normalize(title):
+
+        """Returns the words of the title in lower case, without accents and punctuation"""
+
+        decomposed = unicodedata.normalize('NFKD', title.casefold())
+        return DuplicateFinder._WORD_PATTERN.findall(''.join(char for char in decomposed
+                                                             if not unicodedata.combining(char)))
+
+
+def _init_worker(titles, threshold):
+    global _worker_titles, _worker_threshold
+    _worker_titles = [(title, title.replace(' ', ''), _series_numbers(title)) for title in titles]
+    _worker_threshold = threshold
+
+
+def _score_pairs(pairs):
+
+    """
+    Returns (number, other number, score) for the pairs of normalized titles scoring at least the threshold.
+    The score is the better one of comparing the words in sorted order and the titles without spaces,
+    titles with other series numbers are never similar
+    """
+
+    from thefuzz import fuzz
+    scored = []
+    for number, other_number in pairs:
+        title, joined_title, numbers = _worker_titles[number]
+        other_title, other_joined_title, other_numbers = _worker_titles[other_number]
+        if numbers != other_numbers:
+            continue
+        # the titles are normalized already, so the matcher doesn't have to process them again
+        score = max(fuzz.token_sort_ratio(title, other_title, full_process=False),
+                    fuzz.ratio(joined_title, other_joined_title))
+        if score >= _worker_threshold:
+            scored.append((number, other_number, score))
+    return scored
+
+
+def _series_numbers(title):
+    return {word for word in title.split() if word.isdigit() or word in DuplicateFinder._ROMAN_NUMERALS}
@@ -1,15 +1,72 @@
-from movie_app import MovieApp
+import argparse
+import sys
+from metrics import metrics
+from movie_app import API_KEY, MovieApp
 from storage.storage_json import StorageJson
 from storage.storage_csv import StorageCsv
+from storage.storage_sqlite import StorageSqlite
+from storage.storage_binary import StorageBinary
 
 
 def main():
-    storage = StorageJson('data/data.json')
+    parser = argparse.ArgumentParser(description='My Movies Database')
+    parser.add_argument('--batch', metavar='FILE',
+                        help='run the JSON lines commands from FILE ("-" for stdin) instead of the menu')
+    parser.add_argument('--profile', action='store_true',
+                        help='time the actions, storage I/O and OMDb requests and print the summary at exit')
+    parser.add_argument('--metrics-file', metavar='FILE',
+                        help='also save the profiling summary to FILE as JSON, implies --profile')
+    parser.add_argument('--refresh-ratings', action='store_true',
+                        help='fetch the ratings of the movies from OMDb again and save the changed ones')
+    parser.add_argument('--older-than', metavar='DAYS', type=float,
+                        help='with --refresh-ratings, only the movies fetched more than DAYS ago')
+    parser.add_argument('--find-duplicates', action='store_true',
+                        help='print the movies that are likely in the database twice under a slightly different title')
+    parser.add_argument('--omdb-url', metavar='URL', help='address of the OMDb API, for example of a local stub')
+    args = parser.parse_args()
+
+    if args.profile or args.metrics_file:
+        metrics.enable(args.metrics_file)
+
+    storage = StorageJson('data/data.json', journaled=True)
     # storage = StorageCsv('data/data.csv')
+    # storage = StorageSqlite('data/data.sqlite')
+    # storage = StorageBinary('data/data.mvdb')
+
+    if args.refresh_ratings:
+        from omdb_client import OmdbClient
+        from rating_refresh import RatingRefresher
+        omdb_client = OmdbClient(API_KEY, base_url=args.omdb_url or OmdbClient.BASE_URL)
+        older_than = None if args.older_than is None else args.older_than * 24 * 60 * 60
+        updated, skipped = RatingRefresher(storage, omdb_client).refresh(older_than)
+        for title, old_rating, new_rating in updated:
+            print(f'{title}: {old_rating} -> {new_rating}')
+        for title, reason in skipped:
+            print(f'{title}: {reason}', file=sys.stderr)
+        print(f'{len(updated)} ratings are updated, {len(skipped)} movies are skipped.')
+        return
+
+    if args.find_duplicates:
+        from duplicate_finder import DuplicateFinder
+        duplicates = DuplicateFinder(storage.iter_movies()).find()
+        for score, movie, other_movie in duplicates:
+            print(f'{movie.title} ({movie.year}) and {other_movie.title} ({other_movie.year}): {score}% similar')
+        print(f'{len(duplicates)} likely duplicates found.')
+        return
+
+    if args.batch is not None:
+        from batch_mode import BatchRunner
+        batch_runner = BatchRunner(storage)
+        if args.batch == '-':
+            batch_runner.run(sys.stdin, sys.stdout)
+        else:
+            with open(args.batch, 'r', encoding='utf-8') as commands:
+                batch_runner.run(commands, sys.stdout)
+        return
 
     movie_app = MovieApp(storage)
     movie_app.run()
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,133 @@
+import atexit
+import json
+import sys
+import threading
+import time
+
+
+class _Timer:
+
+    """Adds the time spent inside the with block to the timing of the name"""
+
+    def __init__(self, metrics, name):
+        self._metrics = metrics
+        self._name = name
+        self._start = None
+
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._metrics.record(self._name, time.perf_counter() - self._start)
+        return False
+
+
+class _NullTimer:
+
+    """Stands in for the timer while the metrics are off, so an instrumented block costs next to nothing"""
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+class Metrics:
+
+    """
+    Opt-in profiling of the app: timings of named blocks like the menu actions, parsing and serialization
+    of the storage files, fuzzy matching and OMDb requests, and counters like bytes read and written,
+    file opens and OMDb cache hits. Nothing is recorded until enable() is called.
+    The menu action timings leave out the time the user spends answering the prompts of the action,
+    which is recorded as the prompt timing of the action.
+    Can be used from several threads at once.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._timings = {}  # name -> [count, total seconds, max seconds]
+        self._counters = {}  # name -> value
+        self._lock = threading.Lock()
+        self._file_path = None
+
+
+    def enable(self, file_path=None, summary_at_exit=True):
+
+        """Starts recording, prints the summary to stderr and saves it to file_path if it is given at exit"""
+
+        self.enabled = True
+        self._file_path = file_path
+        if summary_at_exit:
+            atexit.register(self._dump_at_exit)
+
+
+    def timer(self, name):
+        return _Timer(self, name) if self.enabled else _NULL_TIMER
+
+
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            timing = self._timings.setdefault(name, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+
+    def count(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+
+    def summary(self):
+
+        """Returns the timings in milliseconds, the counters and the OMDb cache hit rate as a dict"""
+
+        with self._lock:
+            timings = {name: {'count': count, 'total_ms': total * 1000, 'mean_ms': total / count * 1000,
+                              'max_ms': maximum * 1000}
+                       for name, (count, total, maximum) in sorted(self._timings.items())}
+            counters = dict(sorted(self._counters.items()))
+        summary = {'timings': timings, 'counters': counters}
+        omdb_lookups = counters.get('omdb.cache_hits', 0) + counters.get('omdb.cache_misses', 0)
+        if omdb_lookups:
+            summary['omdb_cache_hit_rate'] = counters.get('omdb.cache_hits', 0) / omdb_lookups
+        return summary
+
+
+    def print_summary(self, stream=None):
+        stream = stream or sys.stderr
+        summary = self.summary()
+        print(f'{"timing":<32} {"count":>7} {"total ms":>11} {"mean ms":>10} {"max ms":>10}', file=stream)
+        for name, timing in summary['timings'].items():
+            print(f'{name:<32} {timing["count"]:>7} {timing["total_ms"]:>11.2f} {timing["mean_ms"]:>10.2f} '
+                  f'{timing["max_ms"]:>10.2f}', file=stream)
+        for name, value in summary['counters'].items():
+            print(f'{name:<32} {value:>7}', file=stream)
+        if 'omdb_cache_hit_rate' in summary:
+            print(f'{"omdb cache hit rate":<32} {summary["omdb_cache_hit_rate"]:>7.0%}', file=stream)
+
+
+    def save(self, file_path):
+        with open(file_path, 'w', encoding='utf-8') as metrics_file:
+            json.dump(self.summary(), metrics_file, indent=1)
+
+
+    def _dump_at_exit(self):
+        self.print_summary()
+        if self._file_path is not None:
+            self.save(self._file_path)
+
+
+_NULL_TIMER = _NullTimer()
+
+# the metrics of the whole app, the instrumented modules record to it
+metrics = Metrics()
@@ -1,12 +1,17 @@
 import random
-import matplotlib.pyplot as plt
-from thefuzz import fuzz
+import time
 from colorama import init, Fore, Style
 from dotenv import load_dotenv
 import os
-import requests
-from template_render import MoviesRender
+from movie_search import MovieSearch
+from movie_stats import MovieStats
+from movie_charts import MovieCharts
+from metrics import metrics
 from storage.istorage import IStorage
+from storage.storage_event import StorageEvent
+
+# matplotlib, thefuzz, requests and jinja2 (through template_render) are imported by the menu actions
+# that use them, so starting the app and listing movies doesn't pay for loading them
 
 load_dotenv()
 init()
@@ -15,11 +20,28 @@ API_KEY = os.getenv('API_KEY')
 
 
 class MovieApp:
-    def __init__(self, storage):
+    # menu choice -> name the time of the action is recorded under when the metrics are on
+    _ACTION_NAMES = {'1': 'list', '2': 'add', '3': 'delete', '4': 'render', '5': 'stats', '6': 'random',
+                     '7': 'search', '8': 'sort_by_rating', '9': 'sort_by_year', '10': 'histogram',
+                     '11': 'filter', '12': 'import', '13': 'refresh_ratings',
+                     '14': 'duplicates'}
+
+
+    def __init__(self, storage, omdb_client=None):
         try:
             if not isinstance(storage, IStorage):
                 raise TypeError('Wrong type of the storage.')
             self._storage = storage
+            # derived from the movies, built on the first use and kept in step with the storage events
+            self._search = None
+            self._stats = None
+            self._charts = None
+            # storage version the website was last generated from
+            self._website_version = None
+            # seconds the current menu action has spent waiting for the user's answers
+            self._prompt_seconds = 0.0
+            storage.subscribe(self._storage_changed)
+            self._omdb_client = omdb_client
         except (TypeError, Exception) as e:
             print(self.error_colour(f"Such error occurred: {e}"))
             quit()
@@ -63,6 +85,9 @@ class MovieApp:
     9. Movies sorted by year
     10. Create rating histogram
     11. Filter movies
+    12. Import movies from a file
+    13. Refresh ratings
+    14. Find duplicate movies
     ''')
         print(Style.RESET_ALL)
 
@@ -75,63 +100,47 @@ class MovieApp:
         print(Style.RESET_ALL)
 
 
+    def _prompt(self, text):
+
+        """Asks the user for the input and adds the time of waiting for it to the prompt time of the action"""
+
+        start = time.perf_counter()
+        try:
+            return input(text)
+        finally:
+            self._prompt_seconds += time.perf_counter() - start
+
+
     def list_movies(self):
 
         """Prints all movies from the database"""
 
         print(f'{len(self._storage.list_movies)} movies in total\n')
         for movie in self._storage.list_movies:
-            name, rating, year, poster = tuple(movie.values())
-            print(f"Name: {name}, Rating: {rating}, Year: {year}\nPoster Link: {poster}\n")
+            print(f"Name: {movie.title}, Rating: {movie.rating}, Year: {movie.year}\nPoster Link: {movie.poster}\n")
 
 
-    def in_database(self, movies, movie_input):
+    def in_database(self, movie_input):
 
-        """Checks if movie is in database and returns movie's index if it was found"""
+        """Checks if movie is in database through the storage's title index"""
 
-        is_found = False
-        for movie_index, movie in enumerate(movies):
-            if movie_input.lower() == movie['Title'].lower():
-                is_found = True
-                return is_found, movie_index
-        return is_found
+        return self._storage.find_movie(movie_input) is not None
 
 
-    def _get_data_api(self, movie_input, movies):
+    def _get_data_api(self, movie_input):
 
         """Validates data from the API and returns it"""
 
+        import requests
+        from omdb_client import movie_from_response
         try:
-            endpoint = f"http://www.omdbapi.com/?apikey={API_KEY}&t={movie_input}"
-            response = requests.get(endpoint)
-            parsed_response = response.json()
-            if parsed_response == {"Response": "False", "Error": "Movie not found!"}:
-                raise ValueError(self.error_colour("Such movie doesn't exist!"))
-            title = parsed_response['Title']
-            if len(title) == 0 or title == 'N/A':
-                print(self.error_colour('Impossible to add the movie!\n'))
-                return None
-            if self.in_database(movies, title):
+            parsed_response = self._get_omdb_client().get_movie(movie_input)
+            title, year, rating, poster = movie_from_response(parsed_response)
+            if self.in_database(title):
                 print(self.error_colour('The movie is already in the database.'))
                 return None
-            year = parsed_response['Year']
-            if len(year) == 0 or year == 'N/A':
-                print(self.error_colour('Impossible to add the movie!\n'))
-                return None
-            if '–' in year:
-                year = year.split('–')[0]
-                year = ''.join(year)
-            rating = parsed_response['imdbRating']
-            if len(rating) == 0 or rating == 'N/A':
-                print(self.error_colour('Impossible to add the movie!\n'))
-                return None
-            float(rating)
-            poster = parsed_response['Poster']
-            if len(poster) == 0 or poster == 'N/A':
-                print(self.error_colour('Impossible to add the movie!\n'))
-                return None
             return title, year, rating, poster
-        except requests.exceptions.ConnectionError:
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
             print(self.error_colour('Impossible to connect to the API!'))
         except requests.exceptions.JSONDecodeError:
             print(self.error_colour('No data from the API'))
@@ -139,16 +148,26 @@ class MovieApp:
             print(self.error_colour(f'The following error has occurred: {e}'))
 
 
-    def add_movie(self, movies):
+    def _get_omdb_client(self):
+
+        """Returns the OMDb client, creating it on the first request to the API"""
+
+        if self._omdb_client is None:
+            from omdb_client import OmdbClient
+            self._omdb_client = OmdbClient(API_KEY)
+        return self._omdb_client
+
+
+    def add_movie(self):
 
         """Adds a movie to the database"""
 
         while True:
             try:
-                movie_input = input(self.input_colour('Enter the movie you would like to add: '))
+                movie_input = self._prompt(self.input_colour('Enter the movie you would like to add: '))
                 if len(movie_input) == 0 or movie_input.isspace():
                     raise Exception(self.error_colour('Movie title must not be blank'))
-                movie_to_add = self._get_data_api(movie_input, movies)
+                movie_to_add = self._get_data_api(movie_input)
                 if movie_to_add is None:
                     return None
                 title, year, rating, poster = movie_to_add
@@ -160,97 +179,180 @@ class MovieApp:
                 print(self.error_colour(f'The following error has occurred: {e}'))
 
 
-    def delete_movie(self, movies):
+    def delete_movie(self):
 
         """Deletes a movie from the database"""
 
         while True:
             try:
-                movie_input = input(self.input_colour('Enter the movie you would like to delete: '))
+                movie_input = self._prompt(self.input_colour('Enter the movie you would like to delete: '))
                 if len(movie_input) == 0 or movie_input.isspace():
                     raise Exception(self.error_colour('Movie title must not be blank'))
                 break
             except Exception as e:
                 print(self.error_colour(f'The following error has occurred: {e}'))
         print(Style.RESET_ALL)
-        movie_in_database = self.in_database(movies, movie_input)
-        if movie_in_database:
-            movie_index = movie_in_database[1]
-            self._storage.delete_movie(movie_index)
+        movie = self._storage.find_movie(movie_input)
+        if movie is not None:
+            self._storage.delete_movie(movie_input)
             print(f'The movie {movie_input} is successfully deleted.')
 
         else:
             print(self.error_colour('There is no such movie in the database :('))
 
 
-    def stats_average_and_median_rating(self, movies):
+    def import_movies(self):
+
+        """Imports the movies listed in a text or CSV file"""
+
+        file_path = self._prompt(self.input_colour('Enter the path of the file with the titles: '))
+        print(Style.RESET_ALL)
+        try:
+            from bulk_import import BulkImporter
+            importer = BulkImporter(self._storage, self._get_omdb_client())
+            added_movies, skipped = importer.import_file(file_path)
+        except FileNotFoundError:
+            print(self.error_colour('There is no such file.'))
+            return
+        except Exception as e:
+            print(self.error_colour(f'The following error has occurred: {e}'))
+            return
+        print(f'{len(added_movies)} movies are successfully added.')
+        for title, reason in skipped:
+            print(self.error_colour(f'{title}: {reason}') + Style.RESET_ALL)
+
+
+    def refresh_ratings(self):
+
+        """Fetches the ratings from the API again and saves the ones that changed"""
+
+        days = self._prompt(self.input_colour('Refresh the ratings fetched more than how many days ago '
+                                              '(leave blank for all): '))
+        print(Style.RESET_ALL)
+        try:
+            older_than = float(days) * 24 * 60 * 60 if days.strip() else None
+            from rating_refresh import RatingRefresher
+            updated, skipped = RatingRefresher(self._storage, self._get_omdb_client()).refresh(older_than)
+        except ValueError:
+            print(self.error_colour('The number of days must be a number.'))
+            return
+        except Exception as e:
+            print(self.error_colour(f'The following error has occurred: {e}'))
+            return
+        for title, old_rating, new_rating in updated:
+            print(f'{title}: {old_rating} -> {new_rating}')
+        print(f'{len(updated)} ratings are updated.')
+        for title, reason in skipped:
+            print(self.error_colour(f'{title}: {reason}') + Style.RESET_ALL)
+
+
+    def find_duplicates(self, movies):
+
+        """Prints the movies that are likely in the database twice under a slightly different title"""
+
+        from duplicate_finder import DuplicateFinder
+        duplicates = DuplicateFinder(movies).find()
+        for score, movie, other_movie in duplicates:
+            print(f'{movie.title} ({movie.year}) and {other_movie.title} ({other_movie.year}): {score}% similar')
+        print(f'{len(duplicates)} likely duplicates found.')
+
+
+    def stats_average_and_median_rating(self, movie_stats):
 
         """Prints the average rating and the median rating of movies"""
 
-        ratings_list = []
-        for movie in movies:
-            ratings_list.append(movie['Rating'])
-        average_rating = round(sum(ratings_list) / len(ratings_list), 1)
-        print(f'Average rating: {average_rating}')
-        if len(ratings_list) % 2 != 0:
-            print(f'Median rating: {round(ratings_list[int(len(ratings_list) / 2)], 1)}')
-        else:
-            print(f'Median rating: '
-                  f'{round((ratings_list[len(ratings_list) // 2 - 1] + ratings_list[len(ratings_list) // 2]) / 2, 1)}')
+        print(f'Average rating: {round(movie_stats.average(), 1)}')
+        print(f'Median rating: {round(movie_stats.median(), 1)}')
 
 
-    def stats_best_movies(self, movies):
+    def stats_best_movies(self, movie_stats):
 
         """Prints the movie(s) with the highest rating"""
 
-        best_movie = ''
-        best_movie_rating = 0
-        best_movies = {}
-        for movie in movies:
-            if movie['Rating'] > best_movie_rating:
-                best_movie = movie['Title']
-                best_movie_rating = movie['Rating']
-                best_movies = {best_movie: best_movie_rating}
-            # checks if there are more than 1 movie with the best rating
-            elif movie['Rating'] == best_movie_rating:
-                best_movies[movie['Title']] = movie['Rating']
+        best_movie_rating, best_movies = movie_stats.best()
         if len(best_movies) == 1:
-            print(f'The movie with the biggest rating: {best_movie}: {best_movie_rating}')
+            print(f'The movie with the biggest rating: {best_movies[0]}: {best_movie_rating}')
         if len(best_movies) > 1:
             print('Movies with the best rating: ')
-            for movie, rating in best_movies.items():
-                print(f'{movie}: {rating}')
+            for movie in best_movies:
+                print(f'{movie}: {best_movie_rating}')
 
 
-    def stats_worst_movies(self, movies):
+    def stats_worst_movies(self, movie_stats):
 
         """Prints the movie(s) with the lowest rating"""
 
-        worst_movie = ''
-        worst_movie_rating = movies[0]['Rating']
-        worst_movies = {}
-        for movie in movies:
-            if movie['Rating'] < worst_movie_rating:
-                worst_movie = movie['Title']
-                worst_movie_rating = movie['Rating']
-                worst_movies = {worst_movie: worst_movie_rating}
-            # checks if there are more than 1 movie with the worst rating
-            elif movie['Rating'] == worst_movie_rating:
-                worst_movies[movie['Title']] = movie['Rating']
+        worst_movie_rating, worst_movies = movie_stats.worst()
         if len(worst_movies) == 1:
-            print(f'The movie with the lowest rating: {worst_movie}: {worst_movie_rating}')
+            print(f'The movie with the lowest rating: {worst_movies[0]}: {worst_movie_rating}')
         if len(worst_movies) > 1:
             print('Movies with the lowest rating: ')
-            for movie, rating in worst_movies.items():
-                print(f'{movie}: {rating}')
+            for movie in worst_movies:
+                print(f'{movie}: {worst_movie_rating}')
 
     def stats(self, movies):
 
         """Executes all stats functions"""
 
-        self.stats_average_and_median_rating(movies)
-        self.stats_best_movies(movies)
-        self.stats_worst_movies(movies)
+        movie_stats = self._get_stats(movies)
+        self.stats_average_and_median_rating(movie_stats)
+        self.stats_best_movies(movie_stats)
+        self.stats_worst_movies(movie_stats)
+
+
+    def _get_stats(self, movies):
+
+        """Returns the catalog statistics, building them on the first use"""
+
+        if self._stats is None:
+            self._stats = MovieStats(movies)
+        return self._stats
+
+
+    def _storage_changed(self, event):
+
+        """
+        Applies the change of the storage to the derived structures that are built already,
+        or drops them to be built again if the movies were reloaded
+        """
+
+        movie = event.movie
+        if event.kind == StorageEvent.RELOADED:
+            self._search = None
+            self._stats = None
+            self._charts = None
+        elif event.kind == StorageEvent.ADDED:
+            if self._search is not None:
+                self._search.add(movie.title)
+            if self._stats is not None:
+                self._stats.add(movie.title, movie.rating)
+            if self._charts is not None:
+                self._charts.add(movie.rating, movie.year)
+        elif event.kind == StorageEvent.DELETED:
+            if self._search is not None:
+                self._search.remove(movie.title)
+            if self._stats is not None:
+                self._stats.remove(movie.title, movie.rating)
+            if self._charts is not None:
+                self._charts.remove(movie.rating, movie.year)
+        elif event.kind == StorageEvent.UPDATED:
+            if self._stats is not None:
+                self._stats.update(movie.title, event.old_rating, movie.rating)
+            if self._charts is not None:
+                self._charts.update_rating(event.old_rating, movie.rating)
+
+
+    def generate_website(self, movies):
+
+        """Generates the website, unless it was generated from the same version of the movies already"""
+
+        from template_render import MoviesRender
+        version = self._storage.version
+        if version == self._website_version and MoviesRender.is_generated():
+            print('The website is up to date, nothing changed since it was generated.')
+            return
+        MoviesRender(movies).render()
+        self._website_version = version
 
 
     def random_movie(self, movies):
@@ -258,7 +360,7 @@ class MovieApp:
         """Prints the random picked movie"""
 
         rand_movie = random.choice(movies)
-        print(f"Your movie for tonight: {rand_movie['Title']}, it's rated {rand_movie['Rating']}")
+        print(f"Your movie for tonight: {rand_movie.title}, it's rated {rand_movie.rating}")
 
 
     def search_movie(self, movies):
@@ -270,39 +372,45 @@ class MovieApp:
 
         while True:
             try:
-                user_query = input(self.input_colour('Enter your search query: '))
+                user_query = self._prompt(self.input_colour('Enter your search query: '))
                 if len(user_query) == 0 or user_query.isspace():
                     raise Exception(self.error_colour('Movie title must not be blank'))
                 break
             except Exception as e:
                 print(self.error_colour(f'The following error has occurred: {e}'))
         print(Style.RESET_ALL)
-        movies_list = []
-        movie_is_found = False
-        for movie in movies:
-            if user_query.lower() == movie['Title'].lower():
-                print(f"{movie['Title']}: {movie['Rating']}")
-                movie_is_found = True
-                break
-            elif fuzz.token_set_ratio(movie['Title'], user_query) > 50:  # setups the level of responses' similarity,
-                # comparing to the sought movie
-                movies_list.append(movie['Title'])
+        search = self._get_search(movies)
+        found_title = search.find(user_query)
+        if found_title is not None:
+            movie = self._storage.find_movie(found_title)
+            print(f"{movie.title}: {movie.rating}")
+            return
+        suggestions = search.search(user_query)
         # checks if the similar movies were found
-        if len(movies_list) > 0 and not movie_is_found:
+        if len(suggestions) > 0:
             print(self.error_colour(f'The movie "{user_query}" does not exist. Did you mean:'))
-            for movie in movies_list:
-                print(movie)
-        elif len(movies_list) == 0 and not movie_is_found:
+            for title, score in suggestions:
+                print(title)
+        else:
             print(self.error_colour(f'The movie "{user_query}" does not exist.'))
 
 
+    def _get_search(self, movies):
+
+        """Returns the search index over the titles, building it on the first use"""
+
+        if self._search is None:
+            self._search = MovieSearch(movie.title for movie in movies)
+        return self._search
+
+
     def movies_sorted_by_rating_descended(self, movies):
 
         """Prints movies sorted by rating in descended order"""
 
-        movies_sorted = sorted(movies, key=lambda movie: movie['Rating'], reverse=True)
+        movies_sorted = self._storage.movies_sorted_by_rating()
         for movie_sorted in movies_sorted:
-            print(f"{movie_sorted['Title']}: {movie_sorted['Rating']}")
+            print(f"{movie_sorted.title}: {movie_sorted.rating}")
 
 
     def movies_sorted_by_year(self, movies):
@@ -314,7 +422,7 @@ class MovieApp:
 
         while True:
             try:
-                user_input = int(input('To see the latest movies first, type "1". To see them last, type "0": '))
+                user_input = int(self._prompt('To see the latest movies first, type "1". To see them last, type "0": '))
                 if user_input != 1 and user_input != 0:
                     raise Exception('Wrong format of the operation. Only "1" or "0" are allowed.')
                 break
@@ -325,32 +433,38 @@ class MovieApp:
                 print(self.error_colour(f'The following error has occurred: {e}'))
             finally:
                 print(Style.RESET_ALL)
-        movies_sorted = sorted(movies, key=lambda movie: movie['Year'], reverse=bool(user_input))
+        movies_sorted = self._storage.movies_sorted_by_year(bool(user_input))
         for movie_sorted in movies_sorted:
-            print(f"{movie_sorted['Title']}: rating: {movie_sorted['Rating']}, year: {movie_sorted['Year']}")
+            print(f"{movie_sorted.title}: rating: {movie_sorted.rating}, year: {movie_sorted.year}")
 
 
     def rating_histogram(self, movies):
 
-        """Creates in the directory the png file with the histogram based on movies' ratings"""
+        """Creates in the directory the png files with the histogram of movies' ratings and the chart of their years"""
 
         try:
-            ratings = []
-            for movie in movies:
-                ratings.append(round(movie['Rating']))
-            plt.hist(ratings)
-            file_name = input(self.input_colour('Enter the file name to save the histogram: '))
+            file_name = self._prompt(self.input_colour('Enter the file name to save the histogram: '))
             print(Style.RESET_ALL)
             if file_name == '' or file_name == ' ':
                 print(self.error_colour('Invalid file name.'))
             else:
-                plt.savefig(file_name + '.png')
+                rating_file, year_file = self._get_charts(movies).save(file_name)
+                print(f'The charts are saved to {rating_file} and {year_file}')
         except Exception as e:
             print(self.error_colour(f'The following error has occurred: {e}'))
         finally:
             print(Style.RESET_ALL)
 
 
+    def _get_charts(self, movies):
+
+        """Returns the charts' bin counts, building them on the first use"""
+
+        if self._charts is None:
+            self._charts = MovieCharts(movies)
+        return self._charts
+
+
     def _get_minimum_rating(self):
 
         """Prompts the user to input the minimum rating of movies, or leave it blank to skip this filter"""
@@ -358,7 +472,8 @@ class MovieApp:
         DISABLE_MIN_RATING = -1
         while True:
             try:
-                minimum_rating = input(self.input_colour('Enter minimum rating (leave blank for no minimum rating): '))
+                minimum_rating = self._prompt(
+                    self.input_colour('Enter minimum rating (leave blank for no minimum rating): '))
                 if len(minimum_rating) > 0:
                     minimum_rating = float(minimum_rating)
                     if minimum_rating > 10 or minimum_rating < 0:
@@ -382,7 +497,7 @@ class MovieApp:
         DISABLE_START_YEAR = -1
         while True:
             try:
-                start_year = input(self.input_colour('Enter start year (leave blank for no start year): '))
+                start_year = self._prompt(self.input_colour('Enter start year (leave blank for no start year): '))
                 if len(start_year) > 0:
                     if start_year.isdigit() and len(start_year) != 4:
                         raise Exception(self.error_colour('Wrong format of the year.'))
@@ -406,7 +521,7 @@ class MovieApp:
         DISABLE_END_YEAR = 10000
         while True:
             try:
-                end_year = input(self.input_colour('Enter end year (leave blank for no end year): '))
+                end_year = self._prompt(self.input_colour('Enter end year (leave blank for no end year): '))
                 if len(end_year) > 0:
                     if end_year.isdigit() and len(end_year) != 4:
                         raise Exception(self.error_colour('Wrong format of the year.'))
@@ -430,64 +545,69 @@ class MovieApp:
         minimum_rating = self._get_minimum_rating()
         end_year = self._get_end_year()
         start_year = self._get_start_year()
-
-
-        def filter_settings(movie_item):
-            if (movie_item['Rating'] >= minimum_rating and end_year >= movie_item['Year'] >= start_year
-                    and movie_item['Year']):
-                return True
-            else:
-                return False
-
-        filtered_movies = filter(filter_settings, movies)
+        filtered_movies = self._storage.filter_movies(minimum_rating, start_year, end_year)
         print('Filtered movies: ')
         for movie in filtered_movies:
-            print(f"{movie['Title']} ({movie['Year']}): {movie['Rating']}")
+            print(f"{movie.title} ({movie.year}): {movie.rating}")
 
 
     def run(self):
 
         """Runs the application"""
 
-        valid_inputs = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '10', '11']
+        valid_inputs = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '10', '11', '12', '13', '14']
         self.title()
         while True:
             movies = self._storage.list_movies
             if not movies:
                 break
             self.menu()
-            user_action = input(self.input_colour('Enter choice (0-11): '))
+            user_action = input(self.input_colour('Enter choice (0-14): '))
             print(Style.RESET_ALL)
             while user_action not in valid_inputs:
                 print(self.error_colour('Invalid choice'))
                 self.menu()
-                user_action = input(self.input_colour('Enter choice (0-11): '))
+                user_action = input(self.input_colour('Enter choice (0-14): '))
                 print(Style.RESET_ALL)
             if user_action == '0':
                 print('Bye!')
                 break
-            if user_action == '1':
-                self.list_movies()
-            if user_action == '2':
-                self.add_movie(movies)
-            if user_action == '3':
-                self.delete_movie(movies)
-            if user_action == '4':
-                website_generator = MoviesRender(movies)
-                website_generator.render()
-            if user_action == '5':
-                self.stats(movies)
-            if user_action == '6':
-                self.random_movie(movies)
-            if user_action == '7':
-                self.search_movie(movies)
-            if user_action == '8':
-                self.movies_sorted_by_rating_descended(movies)
-            if user_action == '9':
-                self.movies_sorted_by_year(movies)
-            if user_action == '10':
-                self.rating_histogram(movies)
-            if user_action == '11':
-                self.filter_movies(movies)
+            self._prompt_seconds = 0.0
+            start = time.perf_counter()
+            try:
+                if user_action == '1':
+                    self.list_movies()
+                if user_action == '2':
+                    self.add_movie()
+                if user_action == '3':
+                    self.delete_movie()
+                if user_action == '4':
+                    self.generate_website(movies)
+                if user_action == '5':
+                    self.stats(movies)
+                if user_action == '6':
+                    self.random_movie(movies)
+                if user_action == '7':
+                    self.search_movie(movies)
+                if user_action == '8':
+                    self.movies_sorted_by_rating_descended(movies)
+                if user_action == '9':
+                    self.movies_sorted_by_year(movies)
+                if user_action == '10':
+                    self.rating_histogram(movies)
+                if user_action == '11':
+                    self.filter_movies(movies)
+                if user_action == '12':
+                    self.import_movies()
+                if user_action == '13':
+                    self.refresh_ratings()
+                if user_action == '14':
+                    self.find_duplicates(movies)
+            finally:
+                # the time the user takes to answer is recorded apart, so the action times can be compared
+                action_name = MovieApp._ACTION_NAMES[user_action]
+                metrics.record(f'action.{action_name}', time.perf_counter() - start - self._prompt_seconds)
+                if self._prompt_seconds:
+                    metrics.record(f'prompt.{action_name}', self._prompt_seconds)
             if user_action in valid_inputs:
                 self.return_to_menu()
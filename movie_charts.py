@@ -0,0 +1,82 @@
+from collections import Counter
+
+
+class MovieCharts:
+
+    """
+    Rating and year distribution charts. The bin counts are kept up to date as movies
+    are added, deleted or re-rated, so saving the charts costs as much as the number of bins,
+    not the number of movies. Every chart is drawn on its own figure without pyplot,
+    so nothing is shown on the screen and nothing is left over from the previous charts.
+    """
+
+    RATING_BINS = range(0, 11)  # ratings are rounded to the whole number
+    YEARS_PER_BIN = 10
+
+
+    def __init__(self, movies=()):
+        self._rating_counts = Counter()
+        self._year_counts = Counter()
+        for movie in movies:
+            self.add(movie.rating, movie.year)
+
+
+    def __len__(self):
+        return sum(self._rating_counts.values())
+
+
+    def add(self, rating, year):
+        self._rating_counts[round(float(rating))] += 1
+        self._year_counts[MovieCharts._year_bin(year)] += 1
+
+
+    def remove(self, rating, year):
+        MovieCharts._decrement(self._rating_counts, round(float(rating)))
+        MovieCharts._decrement(self._year_counts, MovieCharts._year_bin(year))
+
+
+    def update_rating(self, old_rating, new_rating):
+        MovieCharts._decrement(self._rating_counts, round(float(old_rating)))
+        self._rating_counts[round(float(new_rating))] += 1
+
+
+    def save(self, file_name):
+
+        """
+        Saves the rating histogram to file_name.png and the distribution of movies
+        by decades to file_name_years.png, returns the names of the saved files
+        """
+
+        rating_file = f'{file_name}.png'
+        year_file = f'{file_name}_years.png'
+        MovieCharts._save_bar_chart(rating_file, list(MovieCharts.RATING_BINS),
+                                    [self._rating_counts[rating] for rating in MovieCharts.RATING_BINS],
+                                    'Rating', 'Movies', 1)
+        decades = sorted(self._year_counts)
+        MovieCharts._save_bar_chart(year_file, decades, [self._year_counts[decade] for decade in decades],
+                                    'Decade', 'Movies', MovieCharts.YEARS_PER_BIN)
+        return rating_file, year_file
+
+
+    @staticmethod
+    def _save_bar_chart(file_path, bins, counts, x_label, y_label, bin_width):
+        from matplotlib.figure import Figure
+        figure = Figure()
+        axes = figure.subplots()
+        axes.bar(bins, counts, width=bin_width * 0.9, align='edge' if bin_width > 1 else 'center')
+        axes.set_xlabel(x_label)
+        axes.set_ylabel(y_label)
+        figure.savefig(file_path)
+
+
+    @staticmethod
+    def _year_bin(year):
+        year = int(year)
+        return year - year % MovieCharts.YEARS_PER_BIN
+
+
+    @staticmethod
+    def _decrement(counts, key):
+        counts[key] -= 1
+        if counts[key] <= 0:
+            del counts[key]
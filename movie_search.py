@@ -0,0 +1,126 @@
+from collections import Counter, defaultdict
+import re
+from metrics import metrics
+
+
+class MovieSearch:
+
+    """
+    Search index over movie titles. Keeps token and trigram inverted lists,
+    so only the titles that share something with the query are scored with the fuzzy matcher.
+    """
+
+    _SIMILARITY_THRESHOLD = 50  # setups the level of responses' similarity, comparing to the sought movie
+    _MAX_CANDIDATES = 200  # titles with the most shared trigrams that go to the fuzzy scoring
+    _TOKEN_WEIGHT = 3  # a shared word counts as much as several shared trigrams
+    _WORD_PATTERN = re.compile(r'\w+')
+
+
+    def __init__(self, titles=()):
+        self._titles = {}  # case-folded title -> title
+        # case-folded title -> how many times it was added, the same title may be stored more than once
+        self._counts = Counter()
+        self._tokens = defaultdict(set)  # token -> case-folded titles containing it
+        self._trigrams = defaultdict(set)  # trigram -> case-folded titles containing it
+        for title in titles:
+            self.add(title)
+
+
+    def __len__(self):
+        return len(self._titles)
+
+
+    def add(self, title):
+
+        """Adds the title to the index, a title added again is counted"""
+
+        key = title.casefold()
+        self._counts[key] += 1
+        if key in self._titles:
+            return
+        self._titles[key] = title
+        for token in MovieSearch._tokenize(title):
+            self._tokens[token].add(key)
+        for trigram in MovieSearch._trigrams_of(title):
+            self._trigrams[trigram].add(key)
+
+
+    def remove(self, title):
+
+        """Removes the title from the index if it is there, once it was removed as many times as it was added"""
+
+        key = title.casefold()
+        if key not in self._counts:
+            return
+        self._counts[key] -= 1
+        if self._counts[key] > 0:
+            return
+        del self._counts[key]
+        del self._titles[key]
+        for token in MovieSearch._tokenize(title):
+            MovieSearch._discard(self._tokens, token, key)
+        for trigram in MovieSearch._trigrams_of(title):
+            MovieSearch._discard(self._trigrams, trigram, key)
+
+
+    def find(self, query):
+
+        """Returns the title that equals the query ignoring the case or None"""
+
+        return self._titles.get(query.casefold())
+
+
+    def candidates(self, query):
+
+        """Returns the titles sharing the most tokens and trigrams with the query, the best first"""
+
+        overlaps = Counter()
+        for token in MovieSearch._tokenize(query):
+            for key in self._tokens.get(token, ()):
+                overlaps[key] += MovieSearch._TOKEN_WEIGHT
+        for trigram in MovieSearch._trigrams_of(query):
+            for key in self._trigrams.get(trigram, ()):
+                overlaps[key] += 1
+        return [self._titles[key] for key, _ in overlaps.most_common(MovieSearch._MAX_CANDIDATES)]
+
+
+    def search(self, query, limit=10):
+
+        """Returns up to limit (title, score) suggestions similar to the query, the most similar first"""
+
+        from thefuzz import fuzz
+        with metrics.timer('search.candidates'):
+            candidates = self.candidates(query)
+        suggestions = []
+        with metrics.timer('search.fuzzy_matching'):
+            for title in candidates:
+                score = fuzz.token_set_ratio(title, query)
+                if score > MovieSearch._SIMILARITY_THRESHOLD:
+                    suggestions.append((title, score))
+        suggestions.sort(key=lambda suggestion: suggestion[1], reverse=True)
+        return suggestions[:limit]
+
+
+    @staticmethod
+    def _tokenize(text):
+        return set(MovieSearch._WORD_PATTERN.findall(text.casefold()))
+
+
+    @staticmethod
+    def _trigrams_of(text):
+        trigrams = set()
+        for token in MovieSearch._tokenize(text):
+            padded = f' {token} '
+            for start in range(len(padded) - 2):
+                trigrams.add(padded[start:start + 3])
+        return trigrams
+
+
+    @staticmethod
+    def _discard(inverted_list, item, key):
+        keys = inverted_list.get(item)
+        if keys is None:
+            return
+        keys.discard(key)
+        if not keys:
+            del inverted_list[item]
@@ -0,0 +1,139 @@
+from bisect import bisect_left, insort
+from collections import Counter
+
+
+class MovieStats:
+
+    """
+    Catalog statistics kept up to date as movies are added, deleted or re-rated:
+    the running sum and count of the ratings, the number of movies in every rating bucket of one decimal
+    in a Fenwick tree for the median, the best and the worst rating, and the titles of every rating,
+    counted as the same title may be stored more than once.
+    A change and a look-up cost a few steps over the 101 buckets instead of a pass over the catalog.
+    """
+
+    _BUCKETS = 101  # ratings 0.0, 0.1, ... 10.0, the ratings out of the range go to the first or the last bucket
+
+
+    def __init__(self, movies=()):
+        self._sum = 0.0
+        self._count = 0
+        self._tree = [0] * (MovieStats._BUCKETS + 1)  # Fenwick tree of the number of movies in every bucket
+        self._bucket_ratings = {}  # bucket -> the different ratings in it, sorted, usually just one
+        self._rating_counts = Counter()  # rating -> number of movies with it
+        self._titles_by_rating = {}  # rating -> Counter of the titles with it, in the order they were added
+        for movie in movies:
+            self.add(movie.title, movie.rating)
+
+
+    def __len__(self):
+        return self._count
+
+
+    def add(self, title, rating):
+        rating = float(rating)
+        self._sum += rating
+        self._count += 1
+        if self._rating_counts[rating] == 0:
+            insort(self._bucket_ratings.setdefault(MovieStats._bucket(rating), []), rating)
+        self._rating_counts[rating] += 1
+        self._change_bucket(MovieStats._bucket(rating), 1)
+        self._titles_by_rating.setdefault(rating, Counter())[title] += 1
+
+
+    def remove(self, title, rating):
+        rating = float(rating)
+        titles = self._titles_by_rating.get(rating)
+        if titles is None or title not in titles:
+            return
+        titles[title] -= 1
+        if titles[title] == 0:
+            del titles[title]
+        if not titles:
+            del self._titles_by_rating[rating]
+        self._sum -= rating
+        self._count -= 1
+        bucket = MovieStats._bucket(rating)
+        self._change_bucket(bucket, -1)
+        self._rating_counts[rating] -= 1
+        if self._rating_counts[rating] == 0:
+            del self._rating_counts[rating]
+            ratings = self._bucket_ratings[bucket]
+            del ratings[bisect_left(ratings, rating)]
+            if not ratings:
+                del self._bucket_ratings[bucket]
+
+
+    def update(self, title, old_rating, new_rating):
+        self.remove(title, old_rating)
+        self.add(title, new_rating)
+
+
+    def average(self):
+
+        """Returns the average rating or None if there are no movies"""
+
+        if not self._count:
+            return None
+        return self._sum / self._count
+
+
+    def median(self):
+
+        """Returns the median rating or None if there are no movies"""
+
+        if self._count == 0:
+            return None
+        if self._count % 2 != 0:
+            return self._rating_at(self._count // 2)
+        return (self._rating_at(self._count // 2 - 1) + self._rating_at(self._count // 2)) / 2
+
+
+    def best(self):
+
+        """Returns the highest rating and the titles of the movies with it"""
+
+        if not self._count:
+            return None, []
+        rating = self._rating_at(self._count - 1)
+        return rating, list(self._titles_by_rating[rating])
+
+
+    def worst(self):
+
+        """Returns the lowest rating and the titles of the movies with it"""
+
+        if not self._count:
+            return None, []
+        rating = self._rating_at(0)
+        return rating, list(self._titles_by_rating[rating])
+
+
+    def _change_bucket(self, bucket, change):
+        position = bucket + 1
+        while position <= MovieStats._BUCKETS:
+            self._tree[position] += change
+            position += position & -position
+
+
+    def _rating_at(self, index):
+
+        """Returns the rating at the index of all ratings in sorted order"""
+
+        # walks down the tree to the bucket the rating is in, counting off the movies of the buckets before it
+        position = 0
+        step = 1 << (MovieStats._BUCKETS.bit_length() - 1)
+        while step:
+            if position + step <= MovieStats._BUCKETS and self._tree[position + step] <= index:
+                position += step
+                index -= self._tree[position]
+            step //= 2
+        for rating in self._bucket_ratings[position]:
+            if index < self._rating_counts[rating]:
+                return rating
+            index -= self._rating_counts[rating]
+
+
+    @staticmethod
+    def _bucket(rating):
+        return min(max(round(rating * 10), 0), MovieStats._BUCKETS - 1)
@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+import time
+import requests
+from metrics import metrics
+from storage.file_lock import atomic_write
+
+
+def movie_from_response(parsed_response):
+
+    """
+    Validates the parsed OMDb response and returns (title, year, rating, poster) from it.
+    Raises ValueError with the reason if the movie can't be added.
+    """
+
+    if parsed_response.get('Response') == 'False':
+        if parsed_response.get('Error') == OmdbClient.NOT_FOUND_ERROR:
+            raise ValueError("Such movie doesn't exist!")
+        raise ValueError(parsed_response.get('Error', 'No data from the API'))
+    title = parsed_response.get('Title', '')
+    year = parsed_response.get('Year', '')
+    rating = parsed_response.get('imdbRating', '')
+    poster = parsed_response.get('Poster', '')
+    for field in (title, year, rating, poster):
+        if len(field) == 0 or field == 'N/A':
+            raise ValueError('Impossible to add the movie!')
+    if '–' in year:
+        year = year.split('–')[0]
+    float(rating)
+    return title, year, rating, poster
+
+
+class RateLimiter:
+
+    """Spaces out the calls of wait() from any number of threads to at most rate calls per second"""
+
+    def __init__(self, rate):
+        self._interval = 1 / rate
+        self._next_time = time.monotonic()
+        self._lock = threading.Lock()
+
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            call_time = max(now, self._next_time)
+            self._next_time = call_time + self._interval
+        if call_time > now:
+            time.sleep(call_time - now)
+
+
+class OmdbClient:
+
+    """
+    Client of the OMDb API. Reuses connections through one session and keeps
+    the responses, including "Movie not found!", in an append-only cache file on the disk,
+    so the same title is requested from the network only once per ttl. The file is rewritten
+    with the latest unexpired entry of every title when it is loaded and the superseded
+    or expired lines outnumber them.
+    """
+
+    BASE_URL = 'http://www.omdbapi.com/'
+    CACHE_PATH = 'data/omdb_cache.jsonl'
+    CACHE_TTL = 7 * 24 * 60 * 60  # seconds
+    TIMEOUT = (3.05, 10)  # seconds to connect and to read the response
+    RATE_LIMIT = 10  # requests per second
+    NOT_FOUND_ERROR = 'Movie not found!'
+
+
+    def __init__(self, api_key, base_url=BASE_URL, cache_path=CACHE_PATH, cache_ttl=CACHE_TTL, timeout=TIMEOUT,
+                 rate_limit=RATE_LIMIT):
+        self._api_key = api_key
+        self._base_url = base_url
+        self._cache_path = cache_path
+        self._cache_ttl = cache_ttl
+        self._timeout = timeout
+        self._rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        self._session = requests.Session()
+        self._cache = self._load_cache()
+        self._cache_lock = threading.Lock()
+
+
+    def get_movie(self, title, max_age=None):
+
+        """
+        Returns the parsed OMDb response for the title, from the cache if it is younger than
+        max_age seconds, the cache ttl by default, so max_age=0 always asks the API.
+        Raises the requests exceptions if the API can't be reached or returns no JSON.
+        Can be called from several threads at once.
+        """
+
+        key = OmdbClient._cache_key(title)
+        cached = self._cache.get(key)
+        max_age = self._cache_ttl if max_age is None else max_age
+        if cached is not None and time.time() - cached['fetched_at'] < max_age:
+            metrics.count('omdb.cache_hits')
+            return cached['response']
+        metrics.count('omdb.cache_misses')
+        if self._rate_limiter is not None:
+            with metrics.timer('omdb.rate_limit_wait'):
+                self._rate_limiter.wait()
+        with metrics.timer('omdb.request'):
+            response = self._session.get(self._base_url, params={'apikey': self._api_key, 't': title},
+                                         timeout=self._timeout)
+            parsed_response = response.json()
+        if OmdbClient._is_cacheable(parsed_response):
+            self._save_to_cache(key, parsed_response)
+        return parsed_response
+
+
+    def close(self):
+
+        """Closes the connections of the session"""
+
+        self._session.close()
+
+
+    def _load_cache(self):
+
+        """Loads the cached responses, the latest entry of the title wins and the expired ones are dropped"""
+
+        cache = {}
+        if self._cache_path is None or not os.path.exists(self._cache_path):
+            return cache
+        line_count = 0
+        with open(self._cache_path, 'r', encoding='utf-8') as cache_file:
+            for line in cache_file:
+                line_count += 1
+                try:
+                    entry = json.loads(line)
+                except json.decoder.JSONDecodeError:
+                    continue
+                cache[entry['key']] = entry
+        expired_before = time.time() - self._cache_ttl
+        cache = {key: entry for key, entry in cache.items() if entry['fetched_at'] >= expired_before}
+        if line_count - len(cache) > len(cache):
+            self._rewrite_cache(cache)
+        return cache
+
+
+    def _rewrite_cache(self, cache):
+
+        """Replaces the cache file with the given entries"""
+
+        try:
+            with atomic_write(self._cache_path) as cache_file:
+                for entry in cache.values():
+                    cache_file.write(json.dumps(entry) + '\n')
+        except OSError as e:
+            # the cache works without the rewrite, it is only bigger than it has to be
+            print(f'The following error has occurred: {e}')
+
+
+    def _save_to_cache(self, key, parsed_response):
+
+        """Keeps the response in memory and appends it to the cache file"""
+
+        entry = {'key': key, 'fetched_at': time.time(), 'response': parsed_response}
+        with self._cache_lock:
+            self._cache[key] = entry
+            if self._cache_path is None:
+                return
+            with open(self._cache_path, 'a', encoding='utf-8') as cache_file:
+                cache_file.write(json.dumps(entry) + '\n')
+
+
+    @staticmethod
+    def _is_cacheable(parsed_response):
+
+        """Only found movies and "Movie not found!" are cached, other errors like the request limit are not"""
+
+        return parsed_response.get('Response') == 'True' or parsed_response.get('Error') == OmdbClient.NOT_FOUND_ERROR
+
+
+    @staticmethod
+    def _cache_key(title):
+        return ' '.join(title.casefold().split())
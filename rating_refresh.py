@@ -0,0 +1,65 @@
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from omdb_client import movie_from_response
+
+
+class RatingRefresher:
+
+    """
+    Fetches the IMDb ratings of the stored movies again and saves the changed ones.
+    The titles are resolved in a bounded pool of threads with the request rate limited by the OMDb client,
+    and all changed ratings are saved in one storage transaction.
+    """
+
+    MAX_WORKERS = 8
+
+
+    def __init__(self, storage, omdb_client, max_workers=MAX_WORKERS):
+        self._storage = storage
+        self._omdb_client = omdb_client
+        self._max_workers = max_workers
+
+
+    def refresh(self, older_than=None):
+
+        """
+        Refreshes the ratings of all movies, or only of the ones whose OMDb data was fetched
+        more than older_than seconds ago, the others are checked against the cached data.
+        Returns the list of (title, old rating, new rating) for the updated movies
+        and the list of (title, reason) for the ones that couldn't be checked.
+        """
+
+        movies = [(movie.title, movie.year, movie.rating) for movie in self._storage.iter_movies()]
+        max_age = 0 if older_than is None else older_than
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            results = list(executor.map(lambda movie: self._resolve(*movie, max_age), movies))
+        updated = []
+        skipped = []
+        for title, old_rating, new_rating, error in results:
+            if error is not None:
+                skipped.append((title, error))
+            elif new_rating != old_rating:
+                updated.append((title, old_rating, new_rating))
+        if updated:
+            with self._storage.transaction():
+                for title, _, new_rating in updated:
+                    self._storage.update_movie(title, new_rating)
+        return updated, skipped
+
+
+    def _resolve(self, title, year, rating, max_age):
+
+        """Returns (title, old rating, new rating, None) or (title, old rating, None, reason) if it can't be checked"""
+
+        try:
+            found_title, found_year, found_rating, _ = movie_from_response(
+                self._omdb_client.get_movie(title, max_age=max_age))
+            if found_title.casefold() != title.casefold() or int(found_year) != year:
+                return title, rating, None, f'OMDb returned another movie: {found_title} ({found_year})'
+            return title, rating, float(found_rating), None
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            return title, rating, None, 'Impossible to connect to the API!'
+        except requests.exceptions.JSONDecodeError:
+            return title, rating, None, 'No data from the API'
+        except Exception as e:
+            return title, rating, None, str(e)
@@ -0,0 +1,274 @@
+import argparse
+import asyncio
+import json
+import secrets
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+from catalog_queries import CatalogQueries
+from storage.storage_json import StorageJson
+from storage.storage_csv import StorageCsv
+from storage.storage_sqlite import StorageSqlite
+from storage.storage_binary import StorageBinary
+
+
+class CatalogServer:
+
+    """
+    Serves the catalog of any storage as JSON over HTTP, for dashboards and other programs.
+    GET /movies?offset=&limit=                              all movies, a page of them if asked
+    GET /search?query=&limit=                               the movie or the titles similar to the query
+    GET /filter?minimum_rating=&start_year=&end_year=       movies by rating and year range
+    GET /sort?by=rating|year&latest_first=true|false&limit= movies sorted by rating or year
+    GET /stats                                              average, median, best and worst rating
+    GET /random                                             a random movie
+
+    The recently used responses are kept in memory until the storage version changes, and carry the ETag of
+    the version, so a client repeating a request with If-None-Match gets 304 Not Modified
+    while nothing was added, deleted or updated. The storage is only ever used from one thread of its own,
+    so a writer holding the file lock or a reload of a big catalog doesn't stop the other connections,
+    and a storage whose connection may be used by one thread at a time works too.
+    """
+
+    _MAX_HEADERS = 100
+    _MAX_CACHED_RESPONSES = 256
+
+
+    def __init__(self, storage, host='127.0.0.1', port=8000):
+        self._storage = storage
+        self._host = host
+        self._port = port
+        # tells the ETags of this process from the ones given before a restart, when the version starts over
+        self._instance = secrets.token_hex(4)
+        self._version = None
+        self._queries = None
+        # normalized request target -> response body for the current version, the least recently used first
+        self._responses = OrderedDict()
+        self._refresh_task = None  # the snapshot being taken in the storage thread
+        self._storage_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='storage')
+        self._routes = {
+            '/movies': self._route_movies,
+            '/search': self._route_search,
+            '/filter': self._route_filter,
+            '/sort': self._route_sort,
+            '/stats': self._route_stats,
+            '/random': self._route_random,
+        }
+
+
+    async def serve_forever(self):
+        server = await asyncio.start_server(self._handle_connection, self._host, self._port)
+        print(f'Serving the movies on http://{self._host}:{self._port}/movies')
+        async with server:
+            await server.serve_forever()
+
+
+    async def _handle_connection(self, reader, writer):
+
+        """Answers the requests coming over the connection until the client closes it or asks to close it"""
+
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = await CatalogServer._read_headers(reader)
+                content_length = int(headers.get('content-length', 0))
+                if content_length:
+                    await reader.readexactly(content_length)
+                try:
+                    method, target, http_version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._send(writer, 'GET', HTTPStatus.BAD_REQUEST, {'error': 'Malformed request line'})
+                    break
+                try:
+                    status, body, response_headers = await self._respond(method, target, headers)
+                except Exception as e:
+                    print(f'The following error has occurred: {e}')
+                    status, body, response_headers = (HTTPStatus.INTERNAL_SERVER_ERROR,
+                                                      {'error': 'Internal server error'}, {})
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and http_version == 'HTTP/1.1')
+                await self._send(writer, method, status, body, response_headers, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+    async def _respond(self, method, target, headers):
+
+        """Returns the status, the body and the extra headers of the response to the request"""
+
+        if method not in ('GET', 'HEAD'):
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': 'Only GET and HEAD are supported'}, {'Allow': 'GET, HEAD'}
+        url = urlsplit(target)
+        route = self._routes.get(url.path.rstrip('/') or '/')
+        if route is None:
+            return HTTPStatus.NOT_FOUND, {'error': f'Unknown path {url.path}, the paths are: '
+                                                  f'{", ".join(self._routes)}'}, {}
+        parameters = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        await self._refresh()
+        if route == self._route_random:
+            # a new pick every time, so nothing to cache
+            try:
+                return HTTPStatus.OK, route(parameters), {'Cache-Control': 'no-store'}
+            except ValueError as e:
+                return HTTPStatus.BAD_REQUEST, {'error': str(e)}, {}
+        etag = f'"{self._instance}-{self._version}"'
+        response_headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if etag in (tag.strip() for tag in headers.get('if-none-match', '').split(',')):
+            return HTTPStatus.NOT_MODIFIED, None, response_headers
+        key = (url.path, tuple(sorted(parameters.items())))
+        body = self._responses.get(key)
+        if body is None:
+            try:
+                body = json.dumps(route(parameters)).encode('utf-8')
+            except ValueError as e:
+                return HTTPStatus.BAD_REQUEST, {'error': str(e)}, {}
+            self._responses[key] = body
+            if len(self._responses) > CatalogServer._MAX_CACHED_RESPONSES:
+                self._responses.popitem(last=False)
+        else:
+            self._responses.move_to_end(key)
+        return HTTPStatus.OK, body, response_headers
+
+
+    async def _refresh(self):
+
+        """
+        Takes a new snapshot of the catalog in a worker thread if the storage version changed.
+        While one is being taken, the other requests are answered from the last snapshot instead of waiting
+        """
+
+        if self._refresh_task is not None and self._queries is not None:
+            return
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._update_snapshot())
+        # a request whose connection is closed meanwhile doesn't cancel the snapshot for the others
+        await asyncio.shield(self._refresh_task)
+
+
+    async def _update_snapshot(self):
+
+        """Replaces the snapshot and drops the kept responses if the storage version changed"""
+
+        try:
+            snapshot = await asyncio.get_running_loop().run_in_executor(self._storage_executor,
+                                                                         self._take_snapshot)
+            if snapshot is not None:
+                self._version, self._queries = snapshot
+                self._responses.clear()
+        finally:
+            self._refresh_task = None
+
+
+    def _take_snapshot(self):
+
+        """Runs in the storage thread. Returns the storage version and the queries over its movies, or None if the version didn't change"""
+
+        version = self._storage.version
+        if version == self._version:
+            return None
+        return version, CatalogQueries(list(self._storage.list_movies or []))
+
+
+    def _route_movies(self, parameters):
+        return self._queries.list(CatalogServer._number(parameters, 'offset', 0, int),
+                                  CatalogServer._number(parameters, 'limit', None, int))
+
+
+    def _route_search(self, parameters):
+        return self._queries.search(parameters.get('query', ''),
+                                    CatalogServer._number(parameters, 'limit', 10, int))
+
+
+    def _route_filter(self, parameters):
+        return self._queries.filter(CatalogServer._number(parameters, 'minimum_rating', -1, float),
+                                    CatalogServer._number(parameters, 'start_year', -1, int),
+                                    CatalogServer._number(parameters, 'end_year', 10000, int))
+
+
+    def _route_sort(self, parameters):
+        latest_first = parameters.get('latest_first', 'true').lower()
+        if latest_first not in ('true', 'false'):
+            raise ValueError('latest_first must be "true" or "false".')
+        return self._queries.sort(parameters.get('by', 'rating'), latest_first == 'true',
+                                  CatalogServer._number(parameters, 'limit', None, int))
+
+
+    def _route_stats(self, parameters):
+        return self._queries.stats()
+
+
+    def _route_random(self, parameters):
+        return self._queries.random()
+
+
+    @staticmethod
+    async def _read_headers(reader):
+
+        """Reads the header lines up to the empty one, returns them with the names in lower case"""
+
+        headers = {}
+        for _ in range(CatalogServer._MAX_HEADERS):
+            line = await reader.readline()
+            if not line.strip():
+                return headers
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        raise ValueError('Too many headers')
+
+
+    @staticmethod
+    async def _send(writer, method, status, body, headers=None, keep_alive=False):
+
+        """Writes the response, the body is either encoded JSON, an object to encode or None"""
+
+        if body is not None and not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        lines = [f'HTTP/1.1 {status.value} {status.phrase}']
+        for name, value in (headers or {}).items():
+            lines.append(f'{name}: {value}')
+        if body is not None:
+            lines.append('Content-Type: application/json; charset=utf-8')
+        lines.append(f'Content-Length: {0 if body is None else len(body)}')
+        lines.append(f'Connection: {"keep-alive" if keep_alive else "close"}')
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        if body is not None and method != 'HEAD':
+            writer.write(body)
+        await writer.drain()
+
+
+    @staticmethod
+    def _number(parameters, name, default, number_type):
+        if name not in parameters:
+            return default
+        try:
+            return number_type(parameters[name])
+        except ValueError:
+            raise ValueError(f'{name} must be a number, got {parameters[name]!r}.')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='My Movies Database HTTP server')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=8000, help='port to listen on')
+    args = parser.parse_args()
+
+    storage = StorageJson('data/data.json', journaled=True)
+    # storage = StorageCsv('data/data.csv')
+    # storage = StorageSqlite('data/data.sqlite')
+    # storage = StorageBinary('data/data.mvdb')
+
+    try:
+        asyncio.run(CatalogServer(storage, args.host, args.port).serve_forever())
+    except KeyboardInterrupt:
+        print('Bye!')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import contextlib
+import os
+import shutil
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+
+    """
+    Advisory lock shared by all processes opening the same lock file. Readers take it shared,
+    writers exclusive, so a reader never sees a half-written file and two writers never
+    change the same file at once. Holding it again in the same instance is a no-op,
+    the lock is released when the outermost hold ends. An instance is meant for one thread.
+    """
+
+    _RETRY_DELAY = 0.05  # seconds between the attempts where the lock can not be waited for
+
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._depth = 0
+        self._shared = False
+
+
+    def shared(self):
+        return self._hold(shared=True)
+
+
+    def exclusive(self):
+        return self._hold(shared=False)
+
+
+    @contextlib.contextmanager
+    def _hold(self, shared):
+        if self._depth == 0:
+            self._file = open(self.path, 'a+')
+            try:
+                FileLock._lock(self._file, shared)
+            except BaseException:
+                self._file.close()
+                self._file = None
+                raise
+            self._shared = shared
+        elif self._shared and not shared:
+            raise RuntimeError('Can not take the exclusive lock while holding the shared one')
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                FileLock._unlock(self._file)
+                self._file.close()
+                self._file = None
+
+
+    @staticmethod
+    def _lock(file, shared):
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            return
+        # msvcrt has no shared locks and gives up after 10 seconds, so readers lock exclusively and retry
+        file.seek(0)
+        while True:
+            try:
+                msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                time.sleep(FileLock._RETRY_DELAY)
+
+
+    @staticmethod
+    def _unlock(file):
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            return
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextlib.contextmanager
+def atomic_write(file_path, newline=None, binary=False):
+
+    """
+    Opens a temporary file next to file_path for writing and puts it in place of file_path
+    once the block ends, so the file is either the old one or the whole new one, never cut off.
+    Nothing is replaced if the block raises. The file is opened in the binary mode if binary is true.
+    """
+
+    directory, name = os.path.split(os.path.abspath(file_path))
+    descriptor, temp_path = tempfile.mkstemp(prefix=name + '.', suffix='.tmp', dir=directory)
+    try:
+        with open(descriptor, 'wb' if binary else 'w', newline=newline) as file:
+            if os.path.exists(file_path):
+                # mkstemp creates the file readable only by the owner
+                shutil.copymode(file_path, temp_path)
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
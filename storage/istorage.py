@@ -1,4 +1,6 @@
 from abc import ABC, abstractmethod
+from storage.storage_event import StorageEvent
+import contextlib
 
 
 class IStorage(ABC):
@@ -6,7 +8,7 @@ class IStorage(ABC):
     def get_movies(self):
 
         """
-        Returns a list of dictionaries that
+        Returns a list of Movie records that
         contains the movies information in the database.
 
         The function loads the information from the
@@ -20,13 +22,61 @@ class IStorage(ABC):
     def list_movies(self):
 
         """
-        Getter function. Returns a list of dictionaries that
+        Getter function. Returns a list of Movie records that
         contains the movies information.
         """
 
         pass
 
 
+    def iter_movies(self):
+
+        """
+        Returns an iterator over the movies in the database.
+        Backends that can read the movies one by one without
+        loading all of them into memory should override it.
+        """
+
+        return iter(self.list_movies or [])
+
+
+    @abstractmethod
+    def version(self):
+
+        """
+        Getter function. Returns the number that grows every time
+        the movies change, so the data derived from them can be
+        kept until the number is different.
+        """
+
+        pass
+
+
+    def subscribe(self, listener):
+
+        """
+        Calls listener(event) with a StorageEvent after every change
+        of the movies, so the data derived from them can be changed
+        along instead of being built again from all movies.
+        """
+
+        if '_listeners' not in self.__dict__:
+            self._listeners = []
+        self._listeners.append(listener)
+
+
+    def unsubscribe(self, listener):
+        self.__dict__.get('_listeners', []).remove(listener)
+
+
+    def _notify(self, kind, movie=None, old_rating=None):
+
+        """Reports the change to the listeners, the backends call it after every change with the new version"""
+
+        for listener in tuple(self.__dict__.get('_listeners', ())):
+            listener(StorageEvent(kind, self._version, movie, old_rating))
+
+
     @abstractmethod
     def add_movie(self, title, year, rating, poster):
 
@@ -39,8 +89,44 @@ class IStorage(ABC):
         pass
 
 
+    def add_movies(self, movies):
+
+        """
+        Adds many movies to the movies database, movies is an iterable of
+        (title, year, rating, poster) tuples, read once. Backends that can save
+        all of them in one write should override it.
+        """
+
+        for title, year, rating, poster in movies:
+            self.add_movie(title, year, rating, poster)
+
+
+    @contextlib.contextmanager
+    def transaction(self):
+
+        """
+        Context for many changes at once: with storage.transaction(): ...
+        Backends that can keep the changes in memory override it to save
+        all of them in one write when the block ends, and to drop them
+        if the block raises. This one saves every change right away.
+        """
+
+        yield self
+
+
+    @abstractmethod
+    def find_movie(self, title):
+
+        """
+        Returns the movie with the given title ignoring the case,
+        or None if there is no such movie in the database.
+        """
+
+        pass
+
+
     @abstractmethod
-    def delete_movie(self, index):
+    def delete_movie(self, title):
 
         """
         Deletes a movie from the movies database.
@@ -61,3 +147,37 @@ class IStorage(ABC):
         """
 
         pass
+
+
+    def movies_sorted_by_rating(self, limit=None):
+
+        """
+        Returns a list of movies sorted by rating in descending order,
+        only the limit best of them if the limit is given.
+        Backends that keep an index on the rating may override it.
+        """
+
+        return sorted(self.list_movies, key=lambda movie: movie.rating, reverse=True)[:limit]
+
+
+    def movies_sorted_by_year(self, latest_first):
+
+        """
+        Returns a list of movies sorted by year, the latest first or last.
+        Backends that keep an index on the year may override it.
+        """
+
+        return sorted(self.list_movies, key=lambda movie: movie.year, reverse=latest_first)
+
+
+    def filter_movies(self, minimum_rating, start_year, end_year):
+
+        """
+        Returns a list of movies with the rating not lower than minimum_rating
+        released between start_year and end_year inclusive, sorted by year.
+        Backends that keep indexes on the rating and the year may override it.
+        """
+
+        return sorted((movie for movie in self.list_movies
+                       if movie.rating >= minimum_rating and end_year >= movie.year >= start_year and movie.year),
+                      key=lambda movie: movie.year)
@@ -0,0 +1,40 @@
+class Movie:
+
+    """
+    Movie record passed between the storages and the app.
+    The fields live in slots instead of a dictionary per movie, which keeps big catalogs compact.
+    """
+
+    __slots__ = ('title', 'rating', 'year', 'poster')
+
+
+    def __init__(self, title, rating, year, poster):
+        self.title = title
+        self.rating = float(rating)
+        self.year = int(year)
+        self.poster = poster
+
+
+    @classmethod
+    def from_dict(cls, movie):
+
+        """Creates the movie from the dictionary with the Title, Rating, Year and Poster keys"""
+
+        return cls(movie['Title'], movie['Rating'], movie['Year'], movie['Poster'])
+
+
+    def to_dict(self):
+
+        """Returns the dictionary with the Title, Rating, Year and Poster keys the files are saved with"""
+
+        return {'Title': self.title, 'Rating': self.rating, 'Year': self.year, 'Poster': self.poster}
+
+
+    def __eq__(self, other):
+        if not isinstance(other, Movie):
+            return NotImplemented
+        return (self.title, self.rating, self.year, self.poster) == (other.title, other.rating, other.year, other.poster)
+
+
+    def __repr__(self):
+        return f'Movie({self.title!r}, {self.rating!r}, {self.year!r}, {self.poster!r})'
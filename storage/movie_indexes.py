@@ -0,0 +1,79 @@
+from storage.sorted_index import SortedIndex
+from storage.title_index import TitleIndex
+
+
+class MovieIndexes:
+
+    """
+    Title, rating and year indexes over the MovieList of movies held in memory by a storage.
+    The movie list is passed to the functions that change it, so it stays in step with the indexes.
+    """
+
+    def __init__(self, movies):
+        self._titles = TitleIndex(movies)
+        self._ratings = SortedIndex('rating', movies)
+        self._years = SortedIndex('year', movies)
+
+
+    def find(self, title):
+
+        """Returns the movie with the given title ignoring the case or None if it is absent"""
+
+        return self._titles.find(title)
+
+
+    def append(self, movies, movie):
+
+        """Appends the movie to the movie list and indexes it"""
+
+        self._titles.append(movies, movie)
+        self._ratings.add(movie)
+        self._years.add(movie)
+
+
+    def pop(self, movies, title):
+
+        """Removes the movie with the given title from the movie list and the indexes and returns it, or None"""
+
+        movie = self._titles.pop(movies, title)
+        if movie is not None:
+            self._ratings.remove(movie)
+            self._years.remove(movie)
+        return movie
+
+
+    def set_rating(self, movie, rating):
+
+        """Changes the rating of the indexed movie"""
+
+        order = self._ratings.remove(movie)
+        movie.rating = float(rating)
+        self._ratings.add(movie, order)
+
+
+    def sorted_by_rating(self, limit=None):
+        return self._ratings.descending(limit)
+
+
+    def sorted_by_year(self, latest_first):
+        if latest_first:
+            return self._years.descending()
+        return self._years.ascending()
+
+
+    def filter(self, minimum_rating, start_year, end_year):
+
+        """
+        Returns the movies with the rating not lower than minimum_rating released between
+        start_year and end_year inclusive, sorted by year. Counts the matches of both conditions
+        by binary search and walks only the narrower range, checking the other condition on it.
+        """
+
+        maximum_rating = float('inf')
+        if self._ratings.count_between(minimum_rating, maximum_rating) < self._years.count_between(start_year, end_year):
+            movies = [movie for movie in self._ratings.between(minimum_rating, maximum_rating)
+                      if end_year >= movie.year >= start_year and movie.year]
+            movies.sort(key=lambda movie: movie.year)
+            return movies
+        return [movie for movie in self._years.between(start_year, end_year)
+                if movie.rating >= minimum_rating and movie.year]
@@ -0,0 +1,48 @@
+from collections.abc import Sequence
+
+
+class MovieList(Sequence):
+
+    """
+    The movies a storage holds in memory, in the order they were added.
+    They are kept in an insertion-ordered dictionary, so a movie is appended and removed in O(1)
+    without moving the movies after it. The list for the access by position is made on the first such access
+    after a change and kept until the next one.
+    """
+
+    def __init__(self, movies=()):
+        self._movies = {}  # id of the movie -> movie
+        for movie in movies:
+            self._movies[id(movie)] = movie
+        self._list = None
+
+
+    def __len__(self):
+        return len(self._movies)
+
+
+    def __iter__(self):
+        return iter(self._movies.values())
+
+
+    def __contains__(self, movie):
+        return id(movie) in self._movies
+
+
+    def __getitem__(self, index):
+        if self._list is None:
+            self._list = list(self._movies.values())
+        return self._list[index]
+
+
+    def append(self, movie):
+        self._movies[id(movie)] = movie
+        self._list = None
+
+
+    def remove(self, movie):
+
+        """Removes the movie, the very object and not an equal one"""
+
+        del self._movies[id(movie)]
+        self._list = None
@@ -0,0 +1,91 @@
+from bisect import bisect_left, bisect_right
+
+
+class SortedIndex:
+
+    """
+    Movies sorted by one of their fields. The order is kept by bisect insertion and deletion,
+    movies with the same value stay in the order they were indexed in.
+    A movie has to be removed from the index before its field is changed.
+    """
+
+    def __init__(self, field, movies=()):
+        self._field = field
+        # sorted at once, inserting the movies one by one would move the tail of the lists for each of them
+        entries = sorted(((getattr(movie, field), order), movie) for order, movie in enumerate(movies))
+        self._keys = [key for key, _ in entries]  # sorted (value, order) pairs
+        self._movies = [movie for _, movie in entries]  # movies in the same order as the keys
+        self._orders = {id(movie): order for (_, order), movie in entries}  # id of the movie -> order it was indexed in
+        self._next_order = len(self._keys)
+
+
+    def __len__(self):
+        return len(self._keys)
+
+
+    def add(self, movie, order=None):
+
+        """Indexes the movie, order puts it back among the movies with the same value where it was before"""
+
+        if order is None:
+            order = self._next_order
+            self._next_order += 1
+        key = (getattr(movie, self._field), order)
+        position = bisect_left(self._keys, key)
+        self._keys.insert(position, key)
+        self._movies.insert(position, movie)
+        self._orders[id(movie)] = order
+
+
+    def remove(self, movie):
+
+        """Removes the movie from the index and returns the order it was indexed in"""
+
+        order = self._orders.pop(id(movie))
+        position = bisect_left(self._keys, (getattr(movie, self._field), order))
+        del self._keys[position]
+        del self._movies[position]
+        return order
+
+
+    def ascending(self):
+
+        """Returns all movies from the lowest value to the highest"""
+
+        return list(self._movies)
+
+
+    def descending(self, limit=None):
+
+        """Returns the movies from the highest value to the lowest, at most limit of them if it is given"""
+
+        movies = []
+        end = len(self._keys)
+        while end > 0 and (limit is None or len(movies) < limit):
+            start = bisect_left(self._keys, (self._keys[end - 1][0],))
+            movies.extend(self._movies[start:end])
+            end = start
+        return movies if limit is None else movies[:limit]
+
+
+    def between(self, low, high):
+
+        """Returns the movies with the value from low to high inclusive, the lowest first"""
+
+        start, end = self._range(low, high)
+        return self._movies[start:end]
+
+
+    def count_between(self, low, high):
+
+        """Returns the number of movies with the value from low to high inclusive"""
+
+        start, end = self._range(low, high)
+        return end - start
+
+
+    def _range(self, low, high):
+        start = bisect_left(self._keys, (low,))
+        # (high, inf) stands after all keys with the value high whatever their order is
+        end = bisect_right(self._keys, (high, float('inf')))
+        return start, max(start, end)
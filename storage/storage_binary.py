@@ -0,0 +1,459 @@
+from array import array
+from collections.abc import Sequence
+from metrics import metrics
+from storage.file_lock import FileLock, atomic_write
+from storage.istorage import IStorage
+from storage.movie import Movie
+from storage.storage_event import StorageEvent
+import mmap
+import os
+import struct
+import sys
+
+
+class _MappedCatalog:
+
+    """
+    Read-only view of the catalog file mapped into memory. Only the bytes of the asked movies are touched:
+        header      magic, format version, movie count, heap size, bytes of the deleted strings in the heap
+        records     rating, year and the offsets and lengths of the title and the poster, fixed width per movie
+        title order record numbers sorted by the case-folded title, for the binary search by title
+        heap        titles and posters in UTF-8
+    """
+
+    MAGIC = b'MVDB'
+    FORMAT_VERSION = 1
+    HEADER = struct.Struct('<4sHHQQQ')
+    RECORD = struct.Struct('<diQIQI')
+    ORDER_ENTRY = struct.Struct('<I')
+    RATING = struct.Struct('<d')  # the first field of the record, so it can be changed in place
+    # Windows can't replace a file that is mapped by any process, so the file is read into memory there instead
+    USE_MMAP = os.name != 'nt'
+
+
+    def __init__(self, file_path):
+        with open(file_path, 'rb') as file:
+            metrics.count('storage.binary.file_opens')
+            if _MappedCatalog.USE_MMAP:
+                self._mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._mapping = file.read()
+        magic, format_version, _, self.count, self.heap_size, self.garbage = \
+            _MappedCatalog.HEADER.unpack_from(self._mapping)
+        if magic != _MappedCatalog.MAGIC or format_version != _MappedCatalog.FORMAT_VERSION:
+            raise ValueError(f'{file_path} is not a movies catalog '
+                             f'of the format version {_MappedCatalog.FORMAT_VERSION}')
+        self.records_offset = _MappedCatalog.HEADER.size
+        self.order_offset = self.records_offset + self.count * _MappedCatalog.RECORD.size
+        self.heap_offset = self.order_offset + self.count * _MappedCatalog.ORDER_ENTRY.size
+
+
+    def movie(self, number):
+
+        """Returns the movie of the record number"""
+
+        return self.movie_of_record(self.record(number))
+
+
+    def movie_of_record(self, record):
+        rating, year, title_offset, title_length, poster_offset, poster_length = record
+        return Movie(self._string(title_offset, title_length), rating, year,
+                     self._string(poster_offset, poster_length))
+
+
+    def record(self, number):
+        return _MappedCatalog.RECORD.unpack_from(self._mapping,
+                                                 self.records_offset + number * _MappedCatalog.RECORD.size)
+
+
+    def records(self):
+
+        """Returns an iterator over the records of all movies, reading only the fixed-width columns"""
+
+        return _MappedCatalog.RECORD.iter_unpack(self._mapping[self.records_offset:self.order_offset])
+
+
+    def records_bytes(self, start=0, end=None):
+        end = self.count if end is None else end
+        return self._mapping[self.records_offset + start * _MappedCatalog.RECORD.size:
+                             self.records_offset + end * _MappedCatalog.RECORD.size]
+
+
+    def heap_bytes(self):
+        return self._mapping[self.heap_offset:self.heap_offset + self.heap_size]
+
+
+    def order(self):
+
+        """Returns the record numbers sorted by the title as an array"""
+
+        order = array('I', self._mapping[self.order_offset:self.heap_offset])
+        if sys.byteorder == 'big':
+            order.byteswap()
+        return order
+
+
+    def record_number_at(self, position):
+
+        """Returns the number of the record standing at the position of the title order"""
+
+        return _MappedCatalog.ORDER_ENTRY.unpack_from(
+            self._mapping, self.order_offset + position * _MappedCatalog.ORDER_ENTRY.size)[0]
+
+
+    def key_at(self, position):
+
+        """Returns the case-folded title standing at the position of the title order"""
+
+        _, _, title_offset, title_length, _, _ = self.record(self.record_number_at(position))
+        return self._string(title_offset, title_length).casefold()
+
+
+    def bisect(self, key, right=False):
+
+        """Returns the position of the title order where the case-folded title would be inserted"""
+
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            middle_key = self.key_at(middle)
+            if middle_key < key or (right and middle_key == key):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+
+    def find(self, title):
+
+        """Returns (position in the title order, record number) of the first movie with the title or None"""
+
+        key = title.casefold()
+        position = self.bisect(key)
+        if position < self.count and self.key_at(position) == key:
+            return position, self.record_number_at(position)
+        return None
+
+
+    def _string(self, offset, length):
+        start = self.heap_offset + offset
+        return self._mapping[start:start + length].decode('utf-8')
+
+
+class _MovieSequence(Sequence):
+
+    """The movies of the mapped catalog, decoded only when they are accessed"""
+
+    def __init__(self, catalog):
+        self._catalog = catalog
+
+
+    def __len__(self):
+        return self._catalog.count
+
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._catalog.movie(number) for number in range(*index.indices(self._catalog.count))]
+        if index < 0:
+            index += self._catalog.count
+        if not 0 <= index < self._catalog.count:
+            raise IndexError('movie index out of range')
+        return self._catalog.movie(index)
+
+
+class StorageBinary(IStorage):
+
+    """
+    Catalog in a compact binary file read through mmap, or read into memory on Windows, where a mapped file
+    can't be replaced by the adds and deletes. Opening it reads only the header, and a page of
+    the list, a random movie or a lookup by title decode only the movies they return. Sorting by rating and
+    filtering scan the fixed-width columns and decode only the movies in the result.
+    Ratings are updated in place, adds and deletes write a new file that replaces the old one. The strings
+    of the deleted movies stay in the heap until they take up half of it, then the file is compacted.
+    """
+
+    _LOCK_SUFFIX = '.lock'
+
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._lock = FileLock(file_path + StorageBinary._LOCK_SUFFIX)
+        self._version = 0
+        # the mapped file and the (inode, mtime, size) of the file it was mapped from
+        self._catalog = None
+        self._file_signature = None
+        with self._lock.exclusive():
+            if not os.path.exists(file_path):
+                StorageBinary._write_movies(file_path, [])
+        self._load()
+
+
+    @classmethod
+    def from_storage(cls, file_path, storage):
+
+        """Creates the binary catalog filled with the movies of another storage"""
+
+        StorageBinary._write_movies(file_path, list(storage.iter_movies()))
+        return cls(file_path)
+
+
+    def get_movies(self):
+        try:
+            self._reload_if_stale()
+            return [self._catalog.movie_of_record(record) for record in self._catalog.records()]
+        except FileNotFoundError:
+            print('Can not access the database!')
+        except Exception as e:
+            print(f'The following error has occurred: {e}')
+
+
+    @property
+    def list_movies(self):
+        self._reload_if_stale()
+        return _MovieSequence(self._catalog)
+
+
+    def iter_movies(self):
+        self._reload_if_stale()
+        catalog = self._catalog
+        for record in catalog.records():
+            yield catalog.movie_of_record(record)
+
+
+    @property
+    def version(self):
+        self._reload_if_stale()
+        return self._version
+
+
+    def add_movie(self, title, year, rating, poster):
+        self.add_movies([(title, year, rating, poster)])
+
+
+    def add_movies(self, movies):
+        try:
+            with self._lock.exclusive():
+                self._reload_if_stale()
+                catalog = self._catalog
+                records = bytearray(catalog.records_bytes())
+                heap = bytearray(catalog.heap_bytes())
+                added = [Movie(title, rating, year, poster) for title, year, rating, poster in movies]
+                new_titles = []
+                for number, movie in enumerate(added, start=catalog.count):
+                    records += StorageBinary._pack_record(movie, heap)
+                    new_titles.append((movie.title.casefold(), number))
+                # the new titles are merged into the title order, the titles already there aren't read again
+                old_order = catalog.order()
+                order = array('I')
+                previous_position = 0
+                for key, number in sorted(new_titles):
+                    position = catalog.bisect(key, right=True)
+                    order.extend(old_order[previous_position:position])
+                    order.append(number)
+                    previous_position = position
+                order.extend(old_order[previous_position:])
+                self._write(catalog.count + len(new_titles), records, order, heap, catalog.garbage)
+                for movie in added:
+                    self._version += 1
+                    self._notify(StorageEvent.ADDED, movie)
+        except FileNotFoundError:
+            print('Can not access the database!')
+        except Exception as e:
+            print(f'The following error has occurred: {e}')
+
+
+    def find_movie(self, title):
+        self._reload_if_stale()
+        found = self._catalog.find(title)
+        if found is None:
+            return None
+        return self._catalog.movie(found[1])
+
+
+    def delete_movie(self, title):
+        try:
+            with self._lock.exclusive():
+                self._reload_if_stale()
+                catalog = self._catalog
+                found = catalog.find(title)
+                if found is None:
+                    raise Exception(f'There is no movie {title} in the database.')
+                position, number = found
+                movie = catalog.movie(number)
+                _, _, _, title_length, _, poster_length = catalog.record(number)
+                garbage = catalog.garbage + title_length + poster_length
+                if garbage * 2 > catalog.heap_size:
+                    movies = [catalog.movie_of_record(record) for other_number, record in enumerate(catalog.records())
+                              if other_number != number]
+                    self._write_movies(self.file_path, movies)
+                    self._remember_write()
+                else:
+                    self._delete_record(position, number, garbage)
+                self._version += 1
+                self._notify(StorageEvent.DELETED, movie)
+        except FileNotFoundError:
+            print('Can not access the database!')
+        except Exception as e:
+            print(f'The following error has occurred: {e}')
+
+
+    def _delete_record(self, position, number, garbage):
+
+        """Writes the file without the record but with its strings left in the heap as garbage"""
+
+        catalog = self._catalog
+        records = catalog.records_bytes(0, number) + catalog.records_bytes(number + 1)
+        old_order = catalog.order()
+        del old_order[position]
+        # the records after the deleted one move one place up
+        order = array('I', (other_number - 1 if other_number > number else other_number
+                            for other_number in old_order))
+        self._write(catalog.count - 1, records, order, catalog.heap_bytes(), garbage)
+
+
+    def update_movie(self, title, rating):
+        try:
+            with self._lock.exclusive():
+                self._reload_if_stale()
+                found = self._catalog.find(title)
+                if found is None:
+                    raise Exception(f'There is no movie {title} in the database.')
+                old_movie = self._catalog.movie(found[1])
+                with open(self.file_path, 'r+b') as file:
+                    metrics.count('storage.binary.file_opens')
+                    file.seek(self._catalog.records_offset + found[1] * _MappedCatalog.RECORD.size)
+                    file.write(_MappedCatalog.RATING.pack(float(rating)))
+                    file.flush()
+                    os.fsync(file.fileno())
+                # the mapping shows the new rating already, the file read into memory on Windows doesn't
+                self._remember_write()
+                self._version += 1
+                self._notify(StorageEvent.UPDATED, self._catalog.movie(found[1]), old_movie.rating)
+        except FileNotFoundError:
+            print('Can not access the database!')
+        except Exception as e:
+            print(f'The following error has occurred: {e}')
+
+
+    def movies_sorted_by_rating(self, limit=None):
+        self._reload_if_stale()
+        catalog = self._catalog
+        records = list(catalog.records())
+        ratings = [record[0] for record in records]
+        # the reversed sort keeps the movies with the same rating in the order they were added
+        numbers = sorted(range(catalog.count), key=ratings.__getitem__, reverse=True)[:limit]
+        return [catalog.movie_of_record(records[number]) for number in numbers]
+
+
+    def movies_sorted_by_year(self, latest_first):
+        self._reload_if_stale()
+        catalog = self._catalog
+        records = list(catalog.records())
+        years = [record[1] for record in records]
+        numbers = sorted(range(catalog.count), key=years.__getitem__, reverse=latest_first)
+        return [catalog.movie_of_record(records[number]) for number in numbers]
+
+
+    def filter_movies(self, minimum_rating, start_year, end_year):
+        self._reload_if_stale()
+        catalog = self._catalog
+        movies = [catalog.movie_of_record(record) for record in catalog.records()
+                  if record[0] >= minimum_rating and end_year >= record[1] >= start_year and record[1]]
+        movies.sort(key=lambda movie: movie.year)
+        return movies
+
+
+    def compact(self):
+
+        """Writes the file again without the strings of the deleted movies"""
+
+        with self._lock.exclusive():
+            self._reload_if_stale()
+            self._write_movies(self.file_path, self.get_movies())
+            self._remember_write()
+
+
+    def _write(self, count, records, order, heap, garbage):
+
+        """Replaces the file with the given sections, has to be called under the exclusive lock"""
+
+        StorageBinary._write_sections(self.file_path, count, records, order, heap, garbage)
+        self._remember_write()
+
+
+    def _remember_write(self):
+
+        """Maps the file written by this storage, the caller counts the changes in it as new versions"""
+
+        self._catalog = _MappedCatalog(self.file_path)
+        self._file_signature = self._get_file_signature()
+
+
+    def _load(self):
+        with self._lock.shared():
+            file_signature = self._get_file_signature()
+            self._catalog = _MappedCatalog(self.file_path)
+        self._file_signature = file_signature
+        self._version += 1
+        self._notify(StorageEvent.RELOADED)
+
+
+    def _reload_if_stale(self):
+
+        """Maps the file again if another process changed it since it was mapped"""
+
+        if self._get_file_signature() != self._file_signature:
+            self._load()
+
+
+    def _get_file_signature(self):
+
+        """Returns the inode, the modification time and the size of the file"""
+
+        file_stat = os.stat(self.file_path)
+        return file_stat.st_ino, file_stat.st_mtime_ns, file_stat.st_size
+
+
+    @staticmethod
+    def _write_movies(file_path, movies):
+
+        """Writes a new file with the movies"""
+
+        with metrics.timer('storage.binary.serialize'):
+            records = bytearray()
+            heap = bytearray()
+            for movie in movies:
+                records += StorageBinary._pack_record(movie, heap)
+            order = array('I', sorted(range(len(movies)), key=lambda number: (movies[number].title.casefold(), number)))
+        StorageBinary._write_sections(file_path, len(movies), records, order, heap, 0)
+
+
+    @staticmethod
+    def _write_sections(file_path, count, records, order, heap, garbage):
+        if sys.byteorder == 'big':
+            order = array('I', order)
+            order.byteswap()
+        with atomic_write(file_path, binary=True) as file:
+            metrics.count('storage.binary.file_opens')
+            file.write(_MappedCatalog.HEADER.pack(_MappedCatalog.MAGIC, _MappedCatalog.FORMAT_VERSION, 0, count,
+                                                  len(heap), garbage))
+            file.write(records)
+            file.write(order.tobytes())
+            file.write(heap)
+            metrics.count('storage.binary.bytes_written', file.tell())
+
+
+    @staticmethod
+    def _pack_record(movie, heap):
+
+        """Appends the title and the poster of the movie to the heap and returns its packed record"""
+
+        title = movie.title.encode('utf-8')
+        poster = movie.poster.encode('utf-8')
+        title_offset = len(heap)
+        heap += title
+        poster_offset = len(heap)
+        heap += poster
+        return _MappedCatalog.RECORD.pack(movie.rating, movie.year, title_offset, len(title),
+                                          poster_offset, len(poster))
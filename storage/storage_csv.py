@@ -1,26 +1,59 @@
+from metrics import metrics
+from storage.file_lock import FileLock, atomic_write
 from storage.istorage import IStorage
+from storage.movie import Movie
+from storage.movie_indexes import MovieIndexes
+from storage.movie_list import MovieList
+from storage.storage_event import StorageEvent
+import contextlib
 import csv
+import locale
+import os
 
 
 class StorageCsv(IStorage):
+
+    """
+    Several processes can share the file: rows are read under the shared lock, every change is made
+    under the exclusive lock on top of the freshly checked file, and rewrites replace the file as a whole.
+    The changes made in a transaction are applied to the parsed rows and saved in one rewrite when it ends.
+    """
+
+    _FIELDNAMES = ['Title', 'Rating', 'Year', 'Poster']
+    _LOCK_SUFFIX = '.lock'
+    _ENCODING = locale.getpreferredencoding(False)  # the one open() reads and writes the file with
+
+
     def __init__(self, file_path):
         self.file_path = file_path
+        self._lock = FileLock(file_path + StorageCsv._LOCK_SUFFIX)
+        # parsed rows, their indexes and the (inode, mtime, size) of the file they were parsed from
+        self._movies = None
+        self._indexes = None
+        self._file_signature = None
+        self._version = 0
+        self._in_transaction = False
 
 
     def get_movies(self):
         try:
-            with open(self.file_path, 'r') as file:
-                reader = csv.DictReader(file)
-                parsed_movies = []
-                for row in reader:
-                    parsed_movies.append({
-                        'Title': row['Title'],
-                        'Rating': float(row['Rating']),
-                        'Year': int(row['Year']),
-                        'Poster': row['Poster']
-                    })
+            if self._cache_is_valid():
+                return self._movies
+            with self._lock.shared(), open(self.file_path, 'r') as file:
+                file_signature = self._get_file_signature()
+                metrics.count('storage.csv.file_opens')
+                metrics.count('storage.csv.bytes_read', file_signature[2])
+                with metrics.timer('storage.csv.parse'):
+                    reader = csv.DictReader(file)
+                    parsed_movies = MovieList(Movie(row['Title'], row['Rating'], row['Year'], row['Poster'])
+                                              for row in reader)
                 if len(parsed_movies) == 0:
                     raise Exception('Database is empty!')
+                self._movies = parsed_movies
+                self._indexes = MovieIndexes(parsed_movies)
+                self._file_signature = file_signature
+                self._version += 1
+                self._notify(StorageEvent.RELOADED)
                 return parsed_movies
         except FileNotFoundError:
             print('Can not access the database!')
@@ -33,43 +66,256 @@ class StorageCsv(IStorage):
         return self.get_movies()
 
 
+    @property
+    def version(self):
+        # re-parses the file if it was changed by another program, which counts as a new version
+        self.get_movies()
+        return self._version
+
+
     def add_movie(self, title, year, rating, poster):
+        self.add_movies([(title, year, rating, poster)])
+
+
+    def add_movies(self, movies):
         try:
-            with open(self.file_path, 'a', newline='') as file:
-                fieldnames = ['Title', 'Rating', 'Year', 'Poster']
-                writer = csv.DictWriter(file, fieldnames=fieldnames)
-                writer.writerow({'Title': title, 'Rating': rating, 'Year': year, 'Poster': poster})
+            with self._lock.exclusive():
+                added = [Movie(title, rating, year, poster) for title, year, rating, poster in movies]
+                if self._in_transaction:
+                    for movie in added:
+                        self._indexes.append(self._movies, movie)
+                        self._version += 1
+                        self._notify(StorageEvent.ADDED, movie)
+                    return
+                cache_is_valid = self._cache_is_valid()
+                with open(self.file_path, 'a', newline='') as file:
+                    metrics.count('storage.csv.file_opens')
+                    start = file.tell()
+                    with metrics.timer('storage.csv.serialize'):
+                        writer = csv.DictWriter(file, fieldnames=StorageCsv._FIELDNAMES)
+                        # written from the records, movies may be a generator that is used up by now
+                        writer.writerows(movie.to_dict() for movie in added)
+                    metrics.count('storage.csv.bytes_written', file.tell() - start)
+                    file.flush()
+                    os.fsync(file.fileno())
+                if cache_is_valid:
+                    for movie in added:
+                        self._indexes.append(self._movies, movie)
+                    self._file_signature = self._get_file_signature()
+                for movie in added:
+                    self._version += 1
+                    self._notify(StorageEvent.ADDED, movie)
         except FileNotFoundError:
             print('Can not access the database!')
         except Exception as e:
             print(f'The following error has occurred: {e}')
 
 
-    def delete_movie(self, index):
+    def find_movie(self, title):
+        movies = self.get_movies()
+        if movies is None:
+            return None
+        return self._indexes.find(title)
+
+
+    def delete_movie(self, title):
         try:
-            movies = self.get_movies()
-            movies.pop(index)
-            with open(self.file_path, 'w') as file:
-                fieldnames = ['Title', 'Rating', 'Year', 'Poster']
-                writer = csv.DictWriter(file, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(movies)
+            with self._lock.exclusive():
+                if self._in_transaction:
+                    movie = self._indexes.pop(self._movies, title)
+                    if movie is None:
+                        raise Exception(f'There is no movie {title} in the database.')
+                else:
+                    cache_is_valid = self._cache_is_valid()
+                    row = self._rewrite_movie(title, lambda row: None)
+                    movie = Movie(row['Title'], row['Rating'], row['Year'], row['Poster'])
+                    if cache_is_valid:
+                        movie = self._indexes.pop(self._movies, movie.title)
+                        self._file_signature = self._get_file_signature()
+                self._version += 1
+                self._notify(StorageEvent.DELETED, movie)
         except FileNotFoundError:
             print('Can not access the database!')
         except Exception as e:
             print(f'The following error has occurred: {e}')
 
 
-    def update_movie(self, index, rating):
+    def update_movie(self, title, rating):
         try:
-            movies = self.get_movies()
-            movies[index]['Rating'] = rating
-            with open(self.file_path, 'w') as file:
-                fieldnames = ['Title', 'Rating', 'Year', 'Poster']
-                writer = csv.DictWriter(file, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(movies)
+            with self._lock.exclusive():
+                if self._in_transaction:
+                    movie = self._indexes.find(title)
+                    if movie is None:
+                        raise Exception(f'There is no movie {title} in the database.')
+                    old_rating = movie.rating
+                    self._indexes.set_rating(movie, rating)
+                else:
+                    cache_is_valid = self._cache_is_valid()
+                    row = self._rewrite_movie(title, lambda row: dict(row, Rating=float(rating)))
+                    movie = Movie(row['Title'], rating, row['Year'], row['Poster'])
+                    old_rating = float(row['Rating'])
+                    if cache_is_valid:
+                        movie = self._indexes.find(movie.title)
+                        self._indexes.set_rating(movie, rating)
+                        self._file_signature = self._get_file_signature()
+                self._version += 1
+                self._notify(StorageEvent.UPDATED, movie, old_rating)
         except FileNotFoundError:
             print('Can not access the database!')
         except Exception as e:
             print(f'The following error has occurred: {e}')
+
+
+    @contextlib.contextmanager
+    def transaction(self):
+
+        """
+        Applies the changes made in the block to the parsed rows only and replaces the file with them
+        in one write when it ends. If the block raises, the parsed rows are dropped, so they are parsed
+        again from the file the changes never reached. Holds the exclusive lock for the whole block
+        and keeps all rows in memory. A transaction opened inside another one is a part of it.
+        """
+
+        if self._in_transaction:
+            yield self
+            return
+        with self._lock.exclusive():
+            if self.get_movies() is None:
+                # an empty or unreadable file, the rows added in the transaction replace it
+                self._movies = MovieList()
+                self._indexes = MovieIndexes(self._movies)
+                self._file_signature = self._get_file_signature()
+            start_version = self._version
+            self._in_transaction = True
+            try:
+                yield self
+            except BaseException:
+                self._in_transaction = False
+                self._movies = None
+                self._version += 1
+                self._notify(StorageEvent.RELOADED)
+                raise
+            self._in_transaction = False
+            if self._version != start_version:
+                self._write_cached_movies()
+
+
+    def iter_movies(self):
+
+        """Yields the movies from the cache if it is up to date, otherwise straight from the file row by row"""
+
+        if self._cache_is_valid():
+            yield from self._movies
+            return
+        for row in self._stream_rows():
+            yield Movie(row['Title'], row['Rating'], row['Year'], row['Poster'])
+
+
+    def movies_sorted_by_rating(self, limit=None):
+        if self.get_movies() is None:
+            return []
+        return self._indexes.sorted_by_rating(limit)
+
+
+    def movies_sorted_by_year(self, latest_first):
+        if self.get_movies() is None:
+            return []
+        return self._indexes.sorted_by_year(latest_first)
+
+
+    def filter_movies(self, minimum_rating, start_year, end_year):
+        if self.get_movies() is None:
+            return []
+        return self._indexes.filter(minimum_rating, start_year, end_year)
+
+
+    def _stream_rows(self):
+
+        """
+        Yields the rows of the file one by one. The rows appended after the reading started are left out,
+        so a row that is still being written is never read
+        """
+
+        with self._lock.shared():
+            file = open(self.file_path, 'rb')
+            size = os.fstat(file.fileno()).st_size
+        with file:
+            metrics.count('storage.csv.file_opens')
+            metrics.count('storage.csv.bytes_read', size)
+            yield from csv.DictReader(StorageCsv._decoded_lines(file, size))
+
+
+    def _write_cached_movies(self):
+
+        """Replaces the file with the parsed rows, has to be called under the exclusive lock"""
+
+        try:
+            with atomic_write(self.file_path, newline='') as file:
+                metrics.count('storage.csv.file_opens')
+                with metrics.timer('storage.csv.serialize'):
+                    writer = csv.DictWriter(file, fieldnames=StorageCsv._FIELDNAMES)
+                    writer.writeheader()
+                    writer.writerows(movie.to_dict() for movie in self._movies)
+                metrics.count('storage.csv.bytes_written', file.tell())
+        except Exception:
+            # the parsed rows are ahead of the file now, so it is parsed again on the next use
+            self._movies = None
+            raise
+        self._file_signature = self._get_file_signature()
+
+
+    def _rewrite_movie(self, title, change):
+
+        """
+        Streams the rows to a temporary file that replaces the file, so only one row is in memory at a time.
+        change(row) is applied to the first row with the title ignoring the case and returns the row to write
+        instead of it, or None to leave it out. Returns the changed row as it was, raises and leaves the file
+        as it was if there is no such movie. Has to be called under the exclusive lock.
+        """
+
+        key = title.casefold()
+        changed_row = None
+        with atomic_write(self.file_path, newline='') as temp_file:
+            metrics.count('storage.csv.file_opens')
+            writer = csv.DictWriter(temp_file, fieldnames=StorageCsv._FIELDNAMES)
+            writer.writeheader()
+            for row in self._stream_rows():
+                if changed_row is None and row['Title'].casefold() == key:
+                    changed_row = row
+                    row = change(row)
+                    if row is None:
+                        continue
+                writer.writerow(row)
+            if changed_row is None:
+                raise Exception(f'There is no movie {title} in the database.')
+            metrics.count('storage.csv.bytes_written', temp_file.tell())
+        return changed_row
+
+
+    def _get_file_signature(self):
+
+        """Returns the inode, the modification time and the size of the file"""
+
+        file_stat = os.stat(self.file_path)
+        return file_stat.st_ino, file_stat.st_mtime_ns, file_stat.st_size
+
+
+    @staticmethod
+    def _decoded_lines(file, size):
+
+        """Yields the lines of the binary file up to the size in bytes as text"""
+
+        while file.tell() < size:
+            yield file.readline().decode(StorageCsv._ENCODING)
+
+
+    def _cache_is_valid(self):
+
+        """Checks if the parsed rows cache still matches the file on the disk"""
+
+        if self._movies is None:
+            return False
+        try:
+            return self._get_file_signature() == self._file_signature
+        except FileNotFoundError:
+            return False
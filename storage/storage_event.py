@@ -0,0 +1,27 @@
+class StorageEvent:
+
+    """
+    Change of the catalog reported by a storage to its listeners.
+    kind is one of ADDED, DELETED, UPDATED or RELOADED, version is the storage version after the change.
+    movie is the added, deleted or updated movie, old_rating is the rating an updated movie had before.
+    RELOADED comes without a movie when the movies were read again, because another process
+    changed the file or a transaction was rolled back, and everything derived from them has to be rebuilt.
+    """
+
+    ADDED = 'added'
+    DELETED = 'deleted'
+    UPDATED = 'updated'
+    RELOADED = 'reloaded'
+
+    __slots__ = ('kind', 'version', 'movie', 'old_rating')
+
+
+    def __init__(self, kind, version, movie=None, old_rating=None):
+        self.kind = kind
+        self.version = version
+        self.movie = movie
+        self.old_rating = old_rating
+
+
+    def __repr__(self):
+        return f'StorageEvent({self.kind!r}, {self.version!r}, {self.movie!r}, {self.old_rating!r})'
@@ -1,17 +1,57 @@
+from metrics import metrics
+from storage.file_lock import FileLock, atomic_write
 from storage.istorage import IStorage
+from storage.movie import Movie
+from storage.movie_indexes import MovieIndexes
+from storage.movie_list import MovieList
+from storage.storage_event import StorageEvent
+from storage.title_index import TitleIndex
+import contextlib
 import json
+import os
 
 
 class StorageJson(IStorage):
-    def __init__(self, file_path):
+
+    """
+    Several processes can share the file: every change is made under the exclusive lock,
+    after reloading the movies if another process changed the snapshot or the journal
+    since they were loaded, and the snapshot is only ever replaced as a whole.
+    The changes made in a transaction are saved together when it ends.
+    The listeners hear about every change once it is saved, or right away in a transaction,
+    whose rollback reloads the movies.
+    """
+
+    _JOURNAL_SUFFIX = '.journal'
+    _LOCK_SUFFIX = '.lock'
+    _COMPACT_THRESHOLD = 1024 * 1024  # journal size in bytes that triggers the compaction
+
+
+    def __init__(self, file_path, journaled=False, compact_threshold=_COMPACT_THRESHOLD):
         self.file_path = file_path
-        self._movies = self.get_movies()
+        self.journal_path = file_path + StorageJson._JOURNAL_SUFFIX
+        self.journaled = journaled
+        self.compact_threshold = compact_threshold
+        self._lock = FileLock(file_path + StorageJson._LOCK_SUFFIX)
+        self._version = 0
+        # the movies, their indexes and the signature of the snapshot and the journal they were loaded from
+        self._movies = None
+        self._indexes = None
+        self._file_signature = None
+        # journal entries of the changes made in the open transaction, None if there is none
+        self._pending_entries = None
+        self._load()
 
 
     def get_movies(self):
         try:
-            with open(self.file_path, 'r') as file:
-                return json.load(file)
+            with self._lock.shared(), metrics.timer('storage.json.parse'):
+                with open(self.file_path, 'r') as file:
+                    metrics.count('storage.json.file_opens')
+                    metrics.count('storage.json.bytes_read', os.fstat(file.fileno()).st_size)
+                    movies = MovieList(Movie.from_dict(movie) for movie in json.load(file))
+                self._replay_journal(movies)
+                return movies
         except FileNotFoundError:
             print('Can not access the database!')
         except json.decoder.JSONDecodeError:
@@ -22,50 +62,272 @@ class StorageJson(IStorage):
 
     @property
     def list_movies(self):
+        self._reload_if_stale()
         return self._movies
 
 
+    @property
+    def version(self):
+        self._reload_if_stale()
+        return self._version
+
+
     """
     Should I anyway check if I can access file here? Because I check it in get_movies function and if file was not
     found the class will be not instantiated.
-    
-    And should I validate parameters here as well? Because I validate them in movie_app.py. And only if they are valid 
+
+    And should I validate parameters here as well? Because I validate them in movie_app.py. And only if they are valid
     they are given over to these functions.
     """
 
     def add_movie(self, title, year, rating, poster):
+        self.add_movies([(title, year, rating, poster)])
+
+
+    def add_movies(self, movies):
         try:
-            with open(self.file_path, 'w') as file:
-                self._movies.append({
-                    'Title': title,
-                    'Rating': float(rating),
-                    'Year': int(year),
-                    'Poster': poster
-                })
-                file.write(json.dumps(self._movies))
+            with self._lock.exclusive():
+                self._reload_if_stale()
+                added = []
+                for title, year, rating, poster in movies:
+                    movie = Movie(title, rating, year, poster)
+                    self._indexes.append(self._movies, movie)
+                    added.append(movie)
+                self._persist(*({'op': 'add', 'movie': movie.to_dict()} for movie in added))
+                for movie in added:
+                    self._version += 1
+                    self._notify(StorageEvent.ADDED, movie)
         except FileNotFoundError:
             print('Can not access the database!')
         except Exception as e:
             print(f'The following error has occurred: {e}')
 
 
-    def delete_movie(self, index):
+    @contextlib.contextmanager
+    def transaction(self):
+
+        """
+        Keeps the changes made in the block in memory and saves them in one write when it ends.
+        If the block raises, the changes are dropped by loading the movies again from the file,
+        which they never reached. Holds the exclusive lock for the whole block.
+        A transaction opened inside another one is a part of it.
+        """
+
+        if self._pending_entries is not None:
+            yield self
+            return
+        with self._lock.exclusive():
+            self._reload_if_stale()
+            self._pending_entries = []
+            try:
+                yield self
+            except BaseException:
+                self._pending_entries = None
+                self._load()
+                raise
+            entries, self._pending_entries = self._pending_entries, None
+            if entries:
+                self._persist(*entries)
+
+
+    def find_movie(self, title):
+        self._reload_if_stale()
+        return self._indexes.find(title)
+
+
+    def delete_movie(self, title):
         try:
-            with open(self.file_path, 'w') as file:
-                self._movies.pop(index)
-                file.write(json.dumps(self._movies))
+            with self._lock.exclusive():
+                self._reload_if_stale()
+                movie = self._indexes.pop(self._movies, title)
+                if movie is None:
+                    raise Exception(f'There is no movie {title} in the database.')
+                self._persist({'op': 'delete', 'title': movie.title})
+                self._version += 1
+                self._notify(StorageEvent.DELETED, movie)
         except FileNotFoundError:
             print('Can not access the database!')
         except Exception as e:
             print(f'The following error has occurred: {e}')
 
 
-    def update_movie(self, index, rating):
+    def update_movie(self, title, rating):
         try:
-            with open(self.file_path, 'w') as file:
-                self._movies[index]['Rating'] = rating
-                file.write(json.dumps(self._movies))
+            with self._lock.exclusive():
+                movie = self.find_movie(title)
+                if movie is None:
+                    raise Exception(f'There is no movie {title} in the database.')
+                old_rating = movie.rating
+                self._indexes.set_rating(movie, rating)
+                self._persist({'op': 'update', 'title': movie.title, 'rating': movie.rating})
+                self._version += 1
+                self._notify(StorageEvent.UPDATED, movie, old_rating)
         except FileNotFoundError:
             print('Can not access the database!')
         except Exception as e:
             print(f'The following error has occurred: {e}')
+
+
+    def movies_sorted_by_rating(self, limit=None):
+        self._reload_if_stale()
+        return self._indexes.sorted_by_rating(limit)
+
+
+    def movies_sorted_by_year(self, latest_first):
+        self._reload_if_stale()
+        return self._indexes.sorted_by_year(latest_first)
+
+
+    def filter_movies(self, minimum_rating, start_year, end_year):
+        self._reload_if_stale()
+        return self._indexes.filter(minimum_rating, start_year, end_year)
+
+
+    def compact(self):
+
+        """
+        Folds the journal back into the snapshot: writes the current movies
+        to a temporary file, replaces the snapshot with it and removes the journal
+        """
+
+        with self._lock.exclusive():
+            # the changes another process saved since the movies were loaded mustn't be written over
+            self._reload_if_stale()
+            with metrics.timer('storage.json.serialize'):
+                content = json.dumps([movie.to_dict() for movie in self._movies])
+            with atomic_write(self.file_path) as file:
+                metrics.count('storage.json.file_opens')
+                metrics.count('storage.json.bytes_written', len(content))
+                file.write(content)
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            self._file_signature = self._get_file_signature()
+
+
+    def _persist(self, *entries):
+
+        """
+        Saves the mutations either to the journal or by rewriting the whole snapshot,
+        or keeps them until the end of the open transaction. Has to be called under the exclusive lock
+        """
+
+        if self._pending_entries is not None:
+            self._pending_entries.extend(entries)
+            return
+        try:
+            if not self.journaled:
+                self.compact()
+                return
+            with metrics.timer('storage.json.serialize'):
+                content = ''.join(json.dumps(entry) + '\n' for entry in entries)
+            self._truncate_torn_entry()
+            with open(self.journal_path, 'a') as journal:
+                metrics.count('storage.json.file_opens')
+                metrics.count('storage.json.bytes_written', len(content))
+                journal.write(content)
+                journal.flush()
+                os.fsync(journal.fileno())
+                journal_size = journal.tell()
+            self._file_signature = self._get_file_signature()
+            if journal_size >= self.compact_threshold:
+                self.compact()
+        except Exception:
+            # the movies in memory are ahead of the file now, so they are reloaded before the next use
+            self._file_signature = None
+            raise
+
+
+    def _load(self):
+
+        """Loads the movies with their indexes and remembers which state of the files they came from"""
+
+        with self._lock.shared():
+            file_signature = self._get_file_signature()
+            self._movies = self.get_movies()
+        self._indexes = MovieIndexes(self._movies or [])
+        self._file_signature = file_signature
+        self._version += 1
+        self._notify(StorageEvent.RELOADED)
+
+
+    def _reload_if_stale(self):
+
+        """Reloads the movies if another process changed the files since they were loaded"""
+
+        if self._get_file_signature() != self._file_signature:
+            self._load()
+
+
+    def _truncate_torn_entry(self):
+
+        """
+        Cuts off the last journal entry if a crash left it without its newline, so the next entry
+        doesn't end up on the same line. Has to be called under the exclusive lock
+        """
+
+        try:
+            journal = open(self.journal_path, 'r+b')
+        except FileNotFoundError:
+            return
+        with journal:
+            end = journal.seek(0, os.SEEK_END)
+            if end == 0:
+                return
+            journal.seek(end - 1)
+            if journal.read(1) == b'\n':
+                return
+            # the complete entries end at the last newline, looked for backwards a block at a time
+            position = end
+            while position > 0:
+                block_start = max(0, position - 4096)
+                journal.seek(block_start)
+                newline = journal.read(position - block_start).rfind(b'\n')
+                position = block_start
+                if newline != -1:
+                    position += newline + 1
+                    break
+            journal.truncate(position)
+            journal.flush()
+            os.fsync(journal.fileno())
+
+
+    def _get_file_signature(self):
+
+        """Returns the inode, the modification time and the size of the snapshot and the journal"""
+
+        signature = []
+        for path in (self.file_path, self.journal_path):
+            try:
+                file_stat = os.stat(path)
+                signature.append((file_stat.st_ino, file_stat.st_mtime_ns, file_stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+
+    def _replay_journal(self, movies):
+
+        """Applies the mutations saved in the journal to the movies loaded from the snapshot"""
+
+        if not os.path.exists(self.journal_path):
+            return
+        titles = TitleIndex(movies)
+        with open(self.journal_path, 'r') as journal:
+            metrics.count('storage.json.file_opens')
+            metrics.count('storage.json.bytes_read', os.fstat(journal.fileno()).st_size)
+            for line_number, line in enumerate(journal, start=1):
+                if not line.endswith('\n'):
+                    # the last entry was cut off by a crash in the middle of the write, it never happened
+                    break
+                try:
+                    entry = json.loads(line)
+                except json.decoder.JSONDecodeError:
+                    raise Exception(f'The journal {self.journal_path} is corrupted on line {line_number}.')
+                if entry['op'] == 'add':
+                    titles.append(movies, Movie.from_dict(entry['movie']))
+                elif entry['op'] == 'delete':
+                    titles.pop(movies, entry['title'])
+                elif entry['op'] == 'update':
+                    movie = titles.find(entry['title'])
+                    if movie is not None:
+                        movie.rating = float(entry['rating'])
@@ -0,0 +1,217 @@
+from metrics import metrics
+from storage.istorage import IStorage
+from storage.movie import Movie
+from storage.storage_event import StorageEvent
+import sqlite3
+
+
+class StorageSqlite(IStorage):
+    # title_key is the case-folded title, SQLite itself can ignore the case of ASCII letters only
+    _SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS movies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            rating REAL NOT NULL,
+            year INTEGER NOT NULL,
+            poster TEXT NOT NULL,
+            title_key TEXT NOT NULL
+        );
+    '''
+    _INDEXES = '''
+        DROP INDEX IF EXISTS idx_movies_title;
+        CREATE INDEX IF NOT EXISTS idx_movies_title_key ON movies (title_key);
+        CREATE INDEX IF NOT EXISTS idx_movies_year ON movies (year);
+        CREATE INDEX IF NOT EXISTS idx_movies_rating ON movies (rating);
+    '''
+    _COLUMNS = 'title, rating, year, poster'
+    # selects the id of the movie with the given title ignoring the case through the title key index,
+    # the parameter is the case-folded title
+    _ID_BY_TITLE = 'SELECT id FROM movies WHERE title_key = ? ORDER BY id LIMIT 1'
+
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        # the connection may be used from another thread than the one that opened it, like the storage thread
+        # of the server, as long as only one thread uses the storage at a time
+        self._connection = sqlite3.connect(file_path, check_same_thread=False)
+        self._connection.executescript(StorageSqlite._SCHEMA)
+        self._add_title_keys()
+        self._connection.executescript(StorageSqlite._INDEXES)
+        # all movies and the data version of the database they were selected at
+        self._movies = None
+        self._data_version = None
+        # counts the commits of this connection and the data versions seen from the other connections
+        self._version = 0
+        self._seen_data_version = None
+
+
+    @classmethod
+    def from_storage(cls, file_path, storage):
+
+        """Creates the SQLite database filled with the movies of another storage"""
+
+        sqlite_storage = cls(file_path)
+        sqlite_storage.add_movies([(movie.title, movie.year, movie.rating, movie.poster)
+                                   for movie in storage.list_movies])
+        return sqlite_storage
+
+
+    def get_movies(self):
+        try:
+            data_version = self._check_data_version()
+            if self._movies is not None and data_version == self._data_version:
+                return self._movies
+            movies = self._select(f'SELECT {StorageSqlite._COLUMNS} FROM movies ORDER BY id')
+            if len(movies) == 0:
+                raise Exception('Database is empty!')
+            self._movies = movies
+            self._data_version = data_version
+            return movies
+        except sqlite3.Error as e:
+            print(f'Can not access the database! {e}')
+        except Exception as e:
+            print(f'The following error has occurred: {e}')
+
+
+    @property
+    def list_movies(self):
+        return self.get_movies()
+
+
+    @property
+    def version(self):
+        self._check_data_version()
+        return self._version
+
+
+    def iter_movies(self):
+
+        """Yields the movies straight from the database cursor, without selecting all of them at once"""
+
+        cursor = self._connection.execute(f'SELECT {StorageSqlite._COLUMNS} FROM movies ORDER BY id')
+        for row in cursor:
+            yield Movie(*row)
+
+
+    def add_movie(self, title, year, rating, poster):
+        self.add_movies([(title, year, rating, poster)])
+
+
+    def add_movies(self, movies):
+        try:
+            added = [Movie(title, rating, year, poster) for title, year, rating, poster in movies]
+            with metrics.timer('storage.sqlite.execute'), self._connection:
+                self._connection.executemany('INSERT INTO movies (title, rating, year, poster, title_key) '
+                                             'VALUES (?, ?, ?, ?, ?)',
+                                             [(movie.title, movie.rating, movie.year, movie.poster,
+                                               movie.title.casefold()) for movie in added])
+            self._movies = None
+            for movie in added:
+                self._version += 1
+                self._notify(StorageEvent.ADDED, movie)
+        except sqlite3.Error as e:
+            print(f'Can not access the database! {e}')
+        except Exception as e:
+            print(f'The following error has occurred: {e}')
+
+
+    def find_movie(self, title):
+        movies = self._select(f'SELECT {StorageSqlite._COLUMNS} FROM movies '
+                              f'WHERE id = ({StorageSqlite._ID_BY_TITLE})', (title.casefold(),))
+        return movies[0] if movies else None
+
+
+    def delete_movie(self, title):
+        try:
+            movie = self.find_movie(title)
+            if movie is None or self._execute(f'DELETE FROM movies WHERE id = ({StorageSqlite._ID_BY_TITLE})',
+                                              (title.casefold(),)) == 0:
+                raise Exception(f'There is no movie {title} in the database.')
+            self._notify(StorageEvent.DELETED, movie)
+        except sqlite3.Error as e:
+            print(f'Can not access the database! {e}')
+        except Exception as e:
+            print(f'The following error has occurred: {e}')
+
+
+    def update_movie(self, title, rating):
+        try:
+            movie = self.find_movie(title)
+            if movie is None or self._execute(f'UPDATE movies SET rating = ? WHERE id = ({StorageSqlite._ID_BY_TITLE})',
+                                              (float(rating), title.casefold())) == 0:
+                raise Exception(f'There is no movie {title} in the database.')
+            self._notify(StorageEvent.UPDATED, Movie(movie.title, rating, movie.year, movie.poster), movie.rating)
+        except sqlite3.Error as e:
+            print(f'Can not access the database! {e}')
+        except Exception as e:
+            print(f'The following error has occurred: {e}')
+
+
+    def movies_sorted_by_rating(self, limit=None):
+        return self._select(f'SELECT {StorageSqlite._COLUMNS} FROM movies ORDER BY rating DESC, id LIMIT ?',
+                            (-1 if limit is None else limit,))
+
+
+    def movies_sorted_by_year(self, latest_first):
+        order = 'DESC' if latest_first else 'ASC'
+        return self._select(f'SELECT {StorageSqlite._COLUMNS} FROM movies ORDER BY year {order}, id')
+
+
+    def filter_movies(self, minimum_rating, start_year, end_year):
+        return self._select(f'SELECT {StorageSqlite._COLUMNS} FROM movies '
+                            'WHERE rating >= ? AND year BETWEEN ? AND ? AND year != 0 ORDER BY year, id',
+                            (minimum_rating, start_year, end_year))
+
+
+    def _select(self, query, parameters=()):
+
+        """Runs the query and returns the selected movies as a list of Movie records"""
+
+        with metrics.timer('storage.sqlite.select'):
+            return [Movie(*row) for row in self._connection.execute(query, parameters)]
+
+
+    def _execute(self, statement, parameters):
+
+        """Runs the statement in its own transaction, drops the movies cache and returns the number of changed rows"""
+
+        with metrics.timer('storage.sqlite.execute'), self._connection:
+            cursor = self._connection.execute(statement, parameters)
+        self._movies = None
+        if cursor.rowcount > 0:
+            self._version += 1
+        return cursor.rowcount
+
+
+    def _add_title_keys(self):
+
+        """Adds the title key column to a database made before it existed and fills it from the titles"""
+
+        columns = [row[1] for row in self._connection.execute('PRAGMA table_info(movies)')]
+        if 'title_key' in columns:
+            return
+        with self._connection:
+            self._connection.execute("ALTER TABLE movies ADD COLUMN title_key TEXT NOT NULL DEFAULT ''")
+            self._connection.executemany('UPDATE movies SET title_key = ? WHERE id = ?',
+                                         [(title.casefold(), movie_id) for movie_id, title
+                                          in self._connection.execute('SELECT id, title FROM movies')])
+
+
+    def _check_data_version(self):
+
+        """Returns the data version, counting a new one as a new version reloaded from another connection"""
+
+        data_version = self._get_data_version()
+        if data_version != self._seen_data_version:
+            self._seen_data_version = data_version
+            self._version += 1
+            self._notify(StorageEvent.RELOADED)
+        return data_version
+
+
+    def _get_data_version(self):
+
+        """Returns the number that changes every time another connection commits to the database"""
+
+        return self._connection.execute('PRAGMA data_version').fetchone()[0]
+
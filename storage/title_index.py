@@ -0,0 +1,52 @@
+class TitleIndex:
+
+    """
+    Maps case-folded titles to the movies with them, so the movie can be found and removed by its title
+    without scanning the movies. The movies themselves are kept in a MovieList, which is passed
+    to the functions that change it. Of the movies with the same title, the one added first is found.
+    """
+
+    def __init__(self, movies):
+        self._movies = {}  # case-folded title -> movies with it in the order they were added
+        for movie in movies:
+            self._movies.setdefault(TitleIndex._key(movie.title), []).append(movie)
+
+
+    def __contains__(self, title):
+        return TitleIndex._key(title) in self._movies
+
+
+    def find(self, title):
+
+        """Returns the movie with the given title or None if it is absent"""
+
+        movies = self._movies.get(TitleIndex._key(title))
+        return movies[0] if movies else None
+
+
+    def append(self, movies, movie):
+
+        """Appends the movie to the movie list and indexes its title"""
+
+        movies.append(movie)
+        self._movies.setdefault(TitleIndex._key(movie.title), []).append(movie)
+
+
+    def pop(self, movies, title):
+
+        """Removes the movie with the given title from the movie list and returns it, or None if it is absent"""
+
+        key = TitleIndex._key(title)
+        same_title_movies = self._movies.get(key)
+        if not same_title_movies:
+            return None
+        movie = same_title_movies.pop(0)
+        if not same_title_movies:
+            del self._movies[key]
+        movies.remove(movie)
+        return movie
+
+
+    @staticmethod
+    def _key(title):
+        return title.casefold()
@@ -1,14 +1,33 @@
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+import glob
+import gzip
+import hashlib
+import json
+import os
 
 
 class MoviesRender:
-    _ENVIRONMENT = Environment(loader=FileSystemLoader("templates/"))
-    _TEMPLATE = _ENVIRONMENT.get_template("index_template.html")
+    _BYTECODE_CACHE_DIRECTORY = ".jinja_cache"
+    # created on the first render, not when the module is imported
+    _ENVIRONMENT = None
+    _TEMPLATE = "index_template.html"
+    _PAGES_TEMPLATE = "pages_template.html"
     _RESULT_FILENAME = "index.html"
+    _PAGES_DIRECTORY = "pages"
+    _STYLESHEET = "templates/style.css"
+    # the stylesheet is copied here under a name with its content hash, so it can be cached forever
+    _ASSETS_DIRECTORY = "assets"
+    # hashes of the inputs every page was generated from, to skip the pages that didn't change,
+    # and the first movie of every page, to split the catalog into the same pages again
+    _MANIFEST_FILENAME = ".render_manifest.json"
+    PAGE_SIZE = 500  # movies per page, a smaller catalog is rendered to a single page
 
 
-    def __init__(self, movies):
+    def __init__(self, movies, page_size=PAGE_SIZE):
         self.__movies = movies
+        self.__page_size = page_size
+        self.__template_hashes = {}
+        self.__stylesheet = None
         self.__context = {
             "movies": movies
         }
@@ -16,9 +35,193 @@ class MoviesRender:
 
     def render(self):
 
-        """Renders the html page due to template"""
+        """
+        Renders the html page due to template. A catalog bigger than the page size is split into
+        numbered pages with the index page linking to them. Pages whose movies didn't change since
+        the last build are not written again, and a page keeps its movies from build to build,
+        so adding or deleting a movie rewrites only its page, its neighbors at the end of the catalog
+        and the index page.
+        """
 
-        with open(MoviesRender._RESULT_FILENAME, mode="w", encoding="utf-8") as result:
-            result.write(MoviesRender._TEMPLATE.render(self.__context))
-            print(f"Website has been successfully generated to {MoviesRender._RESULT_FILENAME}")
+        manifest = MoviesRender._load_manifest()
+        new_manifest = {}
+        page_starts = []
+        self.__stylesheet = MoviesRender._publish_stylesheet()
+        template = MoviesRender._get_template(MoviesRender._TEMPLATE)
+        if len(self.__movies) <= self.__page_size:
+            written = self._render_page(template, self.__context, MoviesRender._RESULT_FILENAME,
+                                        manifest, new_manifest)
+        else:
+            pages = self._split_pages(manifest.get("page_starts", []))
+            page_starts = [[number, page_movies[0].title, page_movies[0].year] for number, page_movies in pages]
+            file_names = [MoviesRender._page_file_name(number) for number, _ in pages]
+            os.makedirs(MoviesRender._PAGES_DIRECTORY, exist_ok=True)
+            written = 0
+            for position, (number, page_movies) in enumerate(pages):
+                context = {
+                    "movies": page_movies,
+                    "page": number,
+                    "previous_page": file_names[position - 1] if position > 0 else None,
+                    "next_page": file_names[position + 1] if position + 1 < len(pages) else None
+                }
+                written += self._render_page(template, context, MoviesRender._page_path(number),
+                                             manifest, new_manifest)
+            index_context = {
+                "movie_count": len(self.__movies),
+                "pages": [{"number": number,
+                           "file_name": MoviesRender._page_path(number).replace(os.sep, "/"),
+                           "first_title": page_movies[0].title,
+                           "last_title": page_movies[-1].title}
+                          for number, page_movies in pages]
+            }
+            written += self._render_page(MoviesRender._get_template(MoviesRender._PAGES_TEMPLATE), index_context,
+                                         MoviesRender._RESULT_FILENAME, manifest, new_manifest)
+        MoviesRender._remove_stale_pages(manifest, new_manifest)
+        MoviesRender._save_manifest(new_manifest, page_starts)
+        print(f"Website has been successfully generated to {MoviesRender._RESULT_FILENAME} "
+              f"({written} of {len(new_manifest)} pages changed)")
 
+
+    def _split_pages(self, page_starts):
+
+        """
+        Returns the list of (number, movies) pages. A page starts at the movie that started it at the last build,
+        given by the [number, title, year] page starts, so the movies before and after a change stay on their pages.
+        A page whose movies are all gone is left out, and the movies added after the last page fill it
+        up to the page size and then go to new pages.
+        """
+
+        start_numbers = {(title, year): number for number, title, year in page_starts}
+        # the pages after the last one still there are gone, so it is the one new movies are added to
+        last_number = max((start_numbers.get((movie.title, movie.year), 0) for movie in self.__movies), default=0)
+        pages = []
+        for movie in self.__movies:
+            number = start_numbers.get((movie.title, movie.year))
+            if number is not None and (not pages or number > pages[-1][0]):
+                pages.append((number, [movie]))
+            elif not pages:
+                pages.append((page_starts[0][0] if page_starts else 1, [movie]))
+            elif pages[-1][0] >= last_number and len(pages[-1][1]) >= self.__page_size:
+                pages.append((pages[-1][0] + 1, [movie]))
+            else:
+                pages[-1][1].append(movie)
+        return pages
+
+
+    def _render_page(self, template, context, file_name, manifest, new_manifest):
+
+        """
+        Streams the page and its gzip-compressed copy to the files unless the inputs hash is the same
+        as at the last build, returns 1 if the page was written
+        """
+
+        context = dict(context, stylesheet=self.__stylesheet)
+        input_hash = self._hash_inputs(template, context)
+        new_manifest[file_name] = input_hash
+        if (manifest.get("files", {}).get(file_name) == input_hash and os.path.exists(file_name)
+                and os.path.exists(file_name + ".gz")):
+            return 0
+        with open(file_name, mode="w", encoding="utf-8") as result, \
+                gzip.open(file_name + ".gz", mode="wt", encoding="utf-8") as compressed_result:
+            for chunk in template.stream(context):
+                result.write(chunk)
+                compressed_result.write(chunk)
+        return 1
+
+
+    def _hash_inputs(self, template, context):
+
+        """Hashes the template source and everything the page is rendered from"""
+
+        if template.filename not in self.__template_hashes:
+            with open(template.filename, "rb") as template_file:
+                self.__template_hashes[template.filename] = hashlib.sha256(template_file.read()).hexdigest()
+        digest = hashlib.sha256(self.__template_hashes[template.filename].encode("utf-8"))
+        for key, value in sorted(context.items()):
+            if key == "movies":
+                value = [(movie.title, movie.rating, movie.year, movie.poster) for movie in value]
+            digest.update(json.dumps([key, value]).encode("utf-8"))
+        return digest.hexdigest()
+
+
+    @staticmethod
+    def is_generated():
+
+        """Checks if the website files of the last build are still there"""
+
+        return os.path.exists(MoviesRender._RESULT_FILENAME) and os.path.exists(MoviesRender._MANIFEST_FILENAME)
+
+
+    @staticmethod
+    def _get_template(name):
+
+        """Returns the template, loading it from the bytecode cache when the source didn't change"""
+
+        if MoviesRender._ENVIRONMENT is None:
+            os.makedirs(MoviesRender._BYTECODE_CACHE_DIRECTORY, exist_ok=True)
+            MoviesRender._ENVIRONMENT = Environment(
+                loader=FileSystemLoader("templates/"),
+                bytecode_cache=FileSystemBytecodeCache(MoviesRender._BYTECODE_CACHE_DIRECTORY))
+        return MoviesRender._ENVIRONMENT.get_template(name)
+
+
+    @staticmethod
+    def _page_file_name(number):
+        return f"page-{number}.html"
+
+
+    @staticmethod
+    def _page_path(number):
+        return os.path.join(MoviesRender._PAGES_DIRECTORY, MoviesRender._page_file_name(number))
+
+
+    @staticmethod
+    def _remove_stale_pages(manifest, new_manifest):
+
+        """Removes the pages left from the last build of a bigger catalog"""
+
+        for file_name in manifest.get("files", {}):
+            if file_name in new_manifest:
+                continue
+            for stale_file in (file_name, file_name + ".gz"):
+                if os.path.exists(stale_file):
+                    os.remove(stale_file)
+
+
+    @staticmethod
+    def _publish_stylesheet():
+
+        """
+        Copies the stylesheet to the assets directory under the name with its content hash,
+        along with the gzip-compressed copy, and returns the link to it
+        """
+
+        with open(MoviesRender._STYLESHEET, "rb") as stylesheet:
+            content = stylesheet.read()
+        name, extension = os.path.splitext(os.path.basename(MoviesRender._STYLESHEET))
+        file_name = f"{name}.{hashlib.sha256(content).hexdigest()[:12]}{extension}"
+        file_path = os.path.join(MoviesRender._ASSETS_DIRECTORY, file_name)
+        if not os.path.exists(file_path):
+            os.makedirs(MoviesRender._ASSETS_DIRECTORY, exist_ok=True)
+            for old_file in glob.glob(os.path.join(MoviesRender._ASSETS_DIRECTORY, f"{name}.*{extension}*")):
+                os.remove(old_file)
+            with open(file_path, "wb") as asset:
+                asset.write(content)
+            with open(file_path + ".gz", "wb") as compressed_asset:
+                compressed_asset.write(gzip.compress(content, mtime=0))
+        return f"/{MoviesRender._ASSETS_DIRECTORY}/{file_name}"
+
+
+    @staticmethod
+    def _load_manifest():
+        try:
+            with open(MoviesRender._MANIFEST_FILENAME, encoding="utf-8") as manifest_file:
+                return json.load(manifest_file)
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            return {}
+
+
+    @staticmethod
+    def _save_manifest(file_hashes, page_starts):
+        with open(MoviesRender._MANIFEST_FILENAME, mode="w", encoding="utf-8") as manifest_file:
+            json.dump({"files": file_hashes, "page_starts": page_starts}, manifest_file)